@@ -1,3 +1,6 @@
+import types
+import functools
+
 from general_tree_search import AgentDefinition
 from general_tree_search.components.choose import (
     get_choose_uct,
@@ -8,8 +11,17 @@ from general_tree_search.components.evaluate import (
     static_evaluation,
     get_additive_eval,
     get_setter_eval,
+    get_cached_evaluation,
+)
+from general_tree_search.components.control import (
+    timed_termination,
+    amortized_timed_termination,
+    budget_termination,
+    evaluation_termination,
+    result_termination,
+    rollout_termination,
+    if_fully_expanded,
 )
-from general_tree_search.components.control import timed_termination, if_fully_expanded
 from general_tree_search.components.update import get_update_sum, get_update_minimax
 from general_tree_search.components.extract_solution import (
     most_robust_child,
@@ -17,8 +29,23 @@ from general_tree_search.components.extract_solution import (
 )
 
 
-def get_agents(search_time):
-    time_control = timed_termination(search_time)
+VALUE_KEYS = ("static_evaluation", "utility", "sum_utility", "sum_count", "avg_utility")
+
+# budget types, and the termination components they use
+# "time" and "amortized_time" are in seconds, the others are counts
+# "rollout_plies" only applies to agents with rollouts, see get_agents
+BUDGETS = {
+    "time": timed_termination,
+    "amortized_time": amortized_timed_termination,
+    "expansions": budget_termination,
+    "evaluations": evaluation_termination,
+    "result_calls": result_termination,
+    "rollout_plies": rollout_termination,
+}
+
+
+def get_agents(budget, budget_type="time", cache_size=None):
+    time_control = BUDGETS[budget_type](budget)
 
     # we start out with our two well-known search algorithms:
     # MCTS and Best-First Minimax
@@ -29,6 +56,7 @@ def get_agents(search_time):
         "evaluate": get_additive_eval(["utility", "sum_utility"], simulate),
         "update": get_update_sum("utility"),
         "get_solution": most_robust_child,
+        "value_keys": VALUE_KEYS,
     }
 
     bfmm_methods = {
@@ -38,6 +66,7 @@ def get_agents(search_time):
         "evaluate": get_setter_eval(["static_evaluation"], static_evaluation),
         "update": get_update_minimax("static_evaluation"),
         "get_solution": get_minimax_child("static_evaluation"),
+        "value_keys": VALUE_KEYS,
     }
 
     # then all agents are either using one of the above algorithms,
@@ -97,9 +126,49 @@ def get_agents(search_time):
         BFMMSimulationAgent,
     ]
 
+    if budget_type == "rollout_plies":
+        # only the agents evaluating with rollouts use up a budget of rollout moves
+        rollout_agents = {
+            MCTSAgent,
+            MCTSPrincipalAgent,
+            MCTSMinimaxAgent,
+            BFMMSimulationAgent,
+        }
+        agents = [agent for agent in agents if agent in rollout_agents]
+
+    if cache_size is not None:
+        # every agent caches its own static evaluations, so agents playing each
+        # other, even of the same type, never share them, see with_cache;
+        # rollouts are not cached, as a cached rollout repeats the first rollout
+        # of a position every time
+        additive = functools.partial(get_additive_eval, ["utility", "sum_utility"])
+        setter = functools.partial(get_setter_eval, ["static_evaluation"])
+        cached_evaluations = {
+            MCTSEvalAgent: additive,
+            BFMMAgent: setter,
+            BFMMUCTAgent: setter,
+            BFMMExpUtilAgent: additive,
+        }
+        for agent, make_evaluate in cached_evaluations.items():
+            agent.__init__ = with_cache(agent.__init__, make_evaluate, cache_size)
+
     return {agent.__name__: agent for agent in agents}
 
 
+def with_cache(init, make_evaluate, cache_size):
+    """
+    Wraps the `__init__` of an agent type, to give each agent an evaluate component
+    `make_evaluate(evaluate)` with its own cache of `static_evaluation`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        evaluate = get_cached_evaluation(static_evaluation, cache_size)
+        self.evaluate = types.MethodType(make_evaluate(evaluate), self)
+
+    return __init__
+
+
 if __name__ == "__main__":
     from general_tree_search.games import ConnectFourState
 
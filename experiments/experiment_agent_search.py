@@ -3,7 +3,7 @@ from multiprocessing import Pool
 
 import numpy as np
 
-from agents import get_agents
+from agents import BUDGETS, get_agents
 from games import get_game_names, get_initial_state
 
 
@@ -13,7 +13,21 @@ parser.add_argument(
     "--search-time",
     type=float,
     default=1.0,
-    help="Search time per agent (seconds)",
+    help="Search budget per agent, in seconds or in units of the budget type",
+)
+parser.add_argument(
+    "-b",
+    "--budget-type",
+    choices=BUDGETS,
+    default="time",
+    help="What the search budget measures, counts do not depend on the machine",
+)
+parser.add_argument(
+    "-e",
+    "--cache-size",
+    type=int,
+    default=None,
+    help="Cache this many static evaluations per agent (LRU)",
 )
 parser.add_argument(
     "-g",
@@ -40,7 +54,7 @@ parser.add_argument(
 
 args = parser.parse_args()
 
-agent_dict = get_agents(args.search_time)
+agent_dict = get_agents(args.search_time, args.budget_type, args.cache_size)
 game_names = get_game_names()
 
 def hierarchical_ucb(
@@ -3,7 +3,7 @@ import argparse
 from multiprocessing import Pool
 from collections import defaultdict
 
-from agents import get_agents
+from agents import BUDGETS, get_agents
 from games import get_game_names, get_initial_state
 
 
@@ -13,7 +13,21 @@ parser.add_argument(
     "--search-time",
     type=float,
     default=1.0,
-    help="Search time per agent (seconds)",
+    help="Search budget per agent, in seconds or in units of the budget type",
+)
+parser.add_argument(
+    "-b",
+    "--budget-type",
+    choices=BUDGETS,
+    default="time",
+    help="What the search budget measures, counts do not depend on the machine",
+)
+parser.add_argument(
+    "-e",
+    "--cache-size",
+    type=int,
+    default=None,
+    help="Cache this many static evaluations per agent (LRU)",
 )
 parser.add_argument(
     "-g",
@@ -29,6 +43,19 @@ parser.add_argument(
     default=1,
     help="Number of worker processes",
 )
+parser.add_argument(
+    "-r",
+    "--reuse-tree",
+    action="store_true",
+    help="Keep the search tree between moves",
+)
+parser.add_argument(
+    "-m",
+    "--max-nodes",
+    type=int,
+    default=None,
+    help="Maximum number of nodes in a search tree",
+)
 parser.add_argument(
     "-c",
     "--continue_from",
@@ -40,7 +67,7 @@ parser.add_argument(
 args = parser.parse_args()
 
 
-agent_dict = get_agents(args.search_time)
+agent_dict = get_agents(args.search_time, args.budget_type, args.cache_size)
 game_names = get_game_names()
 
     
@@ -74,11 +101,12 @@ def work_generator():
                     yield (idx, game_str, agent1_name, agent2_name)
 
 
-def run_game(args):
-    idx, game_str, agent1_name, agent2_name = args
+def run_game(work):
+    idx, game_str, agent1_name, agent2_name = work
+    agent_args = {"reuse_tree": args.reuse_tree, "max_nodes": args.max_nodes}
     agents = [
-        agent_dict[agent1_name](),
-        agent_dict[agent2_name](),
+        agent_dict[agent1_name](**agent_args),
+        agent_dict[agent2_name](**agent_args),
     ]
 
     state = get_initial_state(game_str)
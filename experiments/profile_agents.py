@@ -0,0 +1,33 @@
+from agents import get_agents
+from games import get_initial_state
+
+SEARCH_TIME = 1.0
+GAMES = ["connect_four", "clobber", "y"]
+PHASES = ["select", "expand", "evaluate", "backpropagate"]
+
+agents = get_agents(SEARCH_TIME)
+
+for game in GAMES:
+    state = get_initial_state(game)
+
+    print(game)
+    print(
+        f"{'agent':8s} {'iters':>7s} "
+        + " ".join(f"{phase:>13s}" for phase in PHASES)
+        + f" {'nodes':>7s} {'terminal':>8s} {'depth':>5s} {'max':>4s}"
+    )
+    for name, agent_type in agents.items():
+        agent = agent_type(instrument=True)
+        agent.search(state)
+        stats = agent.search_stats
+
+        total = sum(stats[f"{phase}_time"] for phase in PHASES)
+        shares = " ".join(
+            f"{stats[f'{phase}_time'] / total:13.1%}" for phase in PHASES
+        )
+        print(
+            f"{name:8s} {stats['iterations']:7.0f} {shares} "
+            f"{stats['expansions']:7.0f} {stats['terminal_hits']:8.0f} "
+            f"{stats['selection_depth_avg']:5.1f} {stats['selection_depth_max']:4.0f}"
+        )
+    print()
@@ -13,13 +13,22 @@ SEARCH_TIME = 0.5
 N_PAIRWISE_GAMES = 100
 N_SEARCH_GAMES = 250
 
-agents = get_agents(SEARCH_TIME)
+# see agents.BUDGETS, SEARCH_TIME is the budget in units of the budget type
+BUDGET_TYPE = "time"
+
+# number of static evaluations to cache per agent, None to disable
+CACHE_SIZE = None
+
+agents = get_agents(SEARCH_TIME, BUDGET_TYPE, CACHE_SIZE)
 
 # base, expensive_result, tall_board
 EXPERIMENT = "expensive_result"
 
 WORKER_COUNT = os.cpu_count()
 
+# keep search trees between moves, and bound their size
+AGENT_ARGS = {"reuse_tree": False, "max_nodes": None}
+
 
 def get_initial_state():
     if EXPERIMENT == "base":
@@ -39,7 +48,7 @@ def run_game(args):
 
     agent1, agent2 = agents[agent1_key], agents[agent2_key]
 
-    pair = (agent1(), agent2())
+    pair = (agent1(**AGENT_ARGS), agent2(**AGENT_ARGS))
 
     state = get_initial_state()
 
@@ -97,7 +106,7 @@ for agent1_key, agent2_key in combinations(agents.keys(), 2):
 
 
 def run_game_sync(agent1, agent2):
-    pair = (agent1(), agent2())
+    pair = (agent1(**AGENT_ARGS), agent2(**AGENT_ARGS))
     state = get_initial_state()
 
     while not state.is_terminal:
@@ -1,4 +1,7 @@
 import general_tree_search.search_tree
+import general_tree_search.array_tree
+import general_tree_search.snapshot
+import general_tree_search.parallel
 import general_tree_search.games
 
 from general_tree_search.tree_search import AgentDefinition
\ No newline at end of file
@@ -0,0 +1,446 @@
+import numpy as np
+from collections import defaultdict
+from collections.abc import Sequence
+from general_tree_search import counters
+from general_tree_search.games import GameState
+
+
+DEFAULT_KEYS = (
+    "static_evaluation",
+    "utility",
+    "sum_utility",
+    "sum_count",
+    "avg_utility",
+)
+
+
+class ArrayTree[T]:
+    """
+    Search tree stored as a struct of arrays, which trades search speed for
+    memory. It is meant for searches whose trees do not fit in memory as `Node`
+    objects, and does not make searches faster.
+
+    Instead of one Python object per node, the structure of the tree (parent,
+    first child, next sibling, depth and generating action) and each value key
+    are stored in preallocated NumPy arrays indexed by node id. The arrays double
+    in size when full.
+
+    Children are linked through `first_child` and `next_sibling`, newest first.
+    The unexpanded actions of a node are not copied, but given by a cursor
+    `n_expanded` into the applicable actions of its state. Orders of the actions
+    stored by expand components are kept in `action_orders`, and orderings of the
+    children kept by choose components in `children_orders`, by node id.
+
+    Game states are computed from the parent state on first access, and are only
+    stored for nodes that are revisited after that, typically when they are
+    expanded. The state of a fresh leaf is held by the handle it was accessed
+    through, and recomputed from the parent state if the leaf is accessed again.
+
+    Nodes are accessed through lightweight `ArrayNode` handles, which implement
+    the same interface as `search_tree.Node`. The children of a node are given as
+    an `ArrayChildren` sequence, which creates the handles on access. Only
+    `components.choose.get_choose_uct` reads the columns by node id; the other
+    components go through handles and their value views, which cost more than the
+    attributes of a `Node`. With a constant evaluation on Connect Four, a search
+    takes about 2x (MCTS) to 5x (deep principal variation searches) as long per
+    iteration, and the tree uses about 4x less memory per node (about 240 instead
+    of 900 bytes).
+
+    Ids of removed nodes are kept in a free list, and reused for new nodes.
+    """
+
+    def __init__(
+        self,
+        state: GameState[T],
+        keys: tuple[str, ...] = DEFAULT_KEYS,
+        capacity: int = 1024,
+    ):
+        self.size = 0
+        self.capacity = capacity
+        self.free: list[int] = []
+
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.next_sibling = np.full(capacity, -1, dtype=np.int32)
+        self.depth = np.zeros(capacity, dtype=np.int32)
+        self.n_expanded = np.zeros(capacity, dtype=np.int32)
+        self.action = np.empty(capacity, dtype=object)
+        self.states: list[GameState[T] | None] = []
+        self.state_computed = np.zeros(capacity, dtype=bool)
+        self.action_orders: dict[int, list] = {}
+        self.children_orders: dict[int, object] = {}
+
+        self.columns = {key: np.zeros(capacity) for key in keys}
+
+        self.root = ArrayNode(self, self.add_node(state, -1, None))
+
+    def __len__(self):
+        return self.size - len(self.free)
+
+    def add_node(
+        self, state: GameState[T] | None, parent: int, action: T | None
+    ) -> int:
+        if self.free:
+            index = self.free.pop()
+            self.states[index] = state
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            index = self.size
+            self.size += 1
+            self.states.append(state)
+
+        self.parent[index] = parent
+        self.action[index] = action
+
+        if parent >= 0:
+            self.depth[index] = self.depth[parent] + 1
+            self.next_sibling[index] = self.first_child[parent]
+            self.first_child[parent] = index
+
+        return index
+
+    def children(self, index: int) -> list[int]:
+        # ids are read as Python ints, which compare faster than NumPy scalars
+        indices = []
+        next_sibling = self.next_sibling.item
+        child = self.first_child.item(index)
+        while child >= 0:
+            indices.append(child)
+            child = next_sibling(child)
+        # siblings are linked newest first, return in order of creation
+        indices.reverse()
+        return indices
+
+    def remove_children(self, index: int):
+        """
+        Removes all descendants of `index`, and resets its expansion cursor.
+        """
+        removed = self.children(index)
+        for i in removed:
+            removed.extend(self.children(i))
+
+        self.first_child[index] = -1
+        self.n_expanded[index] = 0
+        self.children_orders.pop(index, None)
+
+        if removed:
+            removed = np.array(removed)
+            self.parent[removed] = -1
+            self.first_child[removed] = -1
+            self.next_sibling[removed] = -1
+            self.depth[removed] = 0
+            self.n_expanded[removed] = 0
+            self.action[removed] = None
+            self.state_computed[removed] = False
+            for column in self.columns.values():
+                column[removed] = 0.0
+            for i in removed:
+                self.states[i] = None
+                self.action_orders.pop(i, None)
+                self.children_orders.pop(i, None)
+            self.free.extend(removed.tolist())
+
+    def subtree(self, index: int) -> "ArrayTree[T]":
+        """
+        Copies the subtree below `index` into a new, compact tree.
+        """
+        order = [index]
+        new_parents = [-1]
+        i = 0
+        while i < len(order):
+            for child in self.children(order[i]):
+                order.append(child)
+                new_parents.append(i)
+            i += 1
+
+        tree = ArrayTree(
+            self.states[index],
+            tuple(self.columns),
+            max(len(order), self.capacity // 2),
+        )
+        tree.depth[0] = self.depth[index]
+        for i, parent in zip(order[1:], new_parents[1:]):
+            tree.add_node(self.states[i], parent, self.action[i])
+        tree.action_orders = {
+            new: self.action_orders[i]
+            for new, i in enumerate(order)
+            if i in self.action_orders
+        }
+
+        order = np.array(order)
+        n = len(order)
+        tree.n_expanded[:n] = self.n_expanded[order]
+        tree.state_computed[:n] = self.state_computed[order]
+        for key, column in self.columns.items():
+            tree.columns[key][:n] = column[order]
+
+        return tree
+
+    def add_column(self, key: str):
+        self.columns[key] = np.zeros(self.capacity)
+
+    def nbytes(self) -> int:
+        """Bytes used by the arrays, excluding the game states themselves."""
+        arrays = [
+            self.parent,
+            self.first_child,
+            self.next_sibling,
+            self.depth,
+            self.n_expanded,
+            self.action,
+            self.state_computed,
+            *self.columns.values(),
+        ]
+        return sum(a.nbytes for a in arrays)
+
+    def _grow(self):
+        old = self.capacity
+        self.capacity *= 2
+
+        def grow(array, fill):
+            new = np.full(self.capacity, fill, dtype=array.dtype)
+            new[:old] = array
+            return new
+
+        self.parent = grow(self.parent, -1)
+        self.first_child = grow(self.first_child, -1)
+        self.next_sibling = grow(self.next_sibling, -1)
+        self.depth = grow(self.depth, 0)
+        self.n_expanded = grow(self.n_expanded, 0)
+        self.action = grow(self.action, None)
+        self.state_computed = grow(self.state_computed, False)
+        for key, column in self.columns.items():
+            self.columns[key] = grow(column, 0.0)
+
+
+class ArrayValues:
+    """
+    Dict-like view of the values of a single node in an `ArrayTree`.
+    Reading a missing key returns 0.0, like the `defaultdict` used by `Node`.
+    """
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: ArrayTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __getitem__(self, key: str) -> float:
+        try:
+            return self.tree.columns[key].item(self.index)
+        except KeyError:
+            return 0.0
+
+    def __setitem__(self, key: str, value: float):
+        # None is stored as NaN
+        try:
+            self.tree.columns[key][self.index] = value
+        except KeyError:
+            self.tree.add_column(key)
+            self.tree.columns[key][self.index] = value
+
+    def __contains__(self, key: str):
+        return key in self.tree.columns
+
+    def keys(self):
+        return self.tree.columns.keys()
+
+    def items(self):
+        return [(key, self[key]) for key in self.tree.columns]
+
+    def copy(self) -> dict[str, float]:
+        return defaultdict(float, self.items())
+
+
+class ArrayNode[T]:
+    """
+    Handle to a node in an `ArrayTree`, exposing the interface of `search_tree.Node`.
+    Handles are created on demand, and compare equal if they refer to the same node.
+    """
+
+    __slots__ = ("tree", "index", "_state")
+
+    def __init__(
+        self, tree: ArrayTree[T], index: int, state: GameState[T] | None = None
+    ):
+        self.tree = tree
+        self.index = index
+        self._state = state
+
+    def __repr__(self):
+        return f"Node[{self.values}]"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ArrayNode)
+            and self.tree is other.tree
+            and self.index == other.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    @property
+    def _parent(self) -> "ArrayNode[T] | None":
+        index = self.tree.parent.item(self.index)
+        if index < 0:
+            return None
+        return ArrayNode(self.tree, index)
+
+    @property
+    def _children(self) -> "ArrayChildren[T]":
+        return ArrayChildren(self.tree, self.tree.children(self.index))
+
+    @property
+    def depth(self) -> int:
+        return self.tree.depth.item(self.index)
+
+    @property
+    def state(self) -> GameState[T]:
+        if self._state is None:
+            states = self.tree.states
+            state = states[self.index]
+            if state is None:
+                parent = self._parent
+                state = parent.state.result(self.generating_action)
+                counters.current().result_calls += 1
+                # keep the state once it is needed a second time
+                if self.tree.state_computed[self.index]:
+                    states[self.index] = state
+                self.tree.state_computed[self.index] = True
+            self._state = state
+        return self._state
+
+    @property
+    def generating_action(self) -> T | None:
+        return self.tree.action[self.index]
+
+    @property
+    def n_expanded(self) -> int:
+        return self.tree.n_expanded.item(self.index)
+
+    @property
+    def action_order(self) -> list[T] | None:
+        return self.tree.action_orders.get(self.index)
+
+    @action_order.setter
+    def action_order(self, actions: list[T] | None):
+        self.tree.action_orders[self.index] = actions
+
+    @property
+    def children_order(self):
+        return self.tree.children_orders.get(self.index)
+
+    @children_order.setter
+    def children_order(self, order):
+        self.tree.children_orders[self.index] = order
+
+    @property
+    def unexpanded_actions(self) -> list[T]:
+        actions = self.state.applicable_actions
+        return actions[: len(actions) - self.tree.n_expanded.item(self.index)]
+
+    @property
+    def values(self) -> ArrayValues:
+        return ArrayValues(self.tree, self.index)
+
+    @values.setter
+    def values(self, values: dict[str, float]):
+        if (
+            isinstance(values, ArrayValues)
+            and values.tree is self.tree
+            and values.index == self.index
+        ):
+            # updated in place
+            return
+        view = ArrayValues(self.tree, self.index)
+        for key, value in values.items():
+            view[key] = value
+
+    def is_fully_expanded(self):
+        return self.tree.n_expanded.item(self.index) >= len(
+            self.state.applicable_actions
+        )
+
+    def is_max_node(self):
+        return (self.state.moves % 2) == 0
+
+    def pop_action(self) -> T:
+        actions = self.state.applicable_actions
+        n_expanded = self.tree.n_expanded.item(self.index)
+        self.tree.n_expanded[self.index] = n_expanded + 1
+        return actions[len(actions) - 1 - n_expanded]
+
+    def add_child(self, state: GameState[T] | None, action: T) -> "ArrayNode[T]":
+        # nodes with children are revisited, so their state is kept
+        self.tree.states[self.index] = self.state
+        index = self.tree.add_node(None, self.index, action)
+        counters.current().expansions += 1
+        return ArrayNode(self.tree, index, state)
+
+    def remove_children(self):
+        self.tree.remove_children(self.index)
+
+    def detach(self) -> "ArrayNode[T]":
+        """
+        Returns the root of a compacted copy of the subtree below this node,
+        so the storage of the rest of the tree can be reclaimed.
+        """
+        self.tree.states[self.index] = self.state
+        return self.tree.subtree(self.index).root
+
+    def to_tree_string(self, indent=0, max_indent=None):
+        if max_indent is not None and indent > max_indent:
+            return ""
+
+        string = indent * "--" + str(self) + "\n"
+        for c in self._children:
+            string += c.to_tree_string(indent + 1, max_indent)
+        return string
+
+
+class ArrayChildren[T](Sequence):
+    """
+    The children of a node in an `ArrayTree`, in order of creation. Handles are
+    only created for the children that are accessed, and components may read the
+    columns of the tree at `indices` instead (see `components.choose`).
+    """
+
+    __slots__ = ("tree", "indices")
+
+    def __init__(self, tree: ArrayTree[T], indices: list[int]):
+        self.tree = tree
+        self.indices = indices
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ArrayNode(self.tree, index) for index in self.indices[i]]
+        return ArrayNode(self.tree, self.indices[i])
+
+    def __iter__(self):
+        tree = self.tree
+        for index in self.indices:
+            yield ArrayNode(tree, index)
+
+
+def get_array_tree(capacity: int = 1024, keys: tuple[str, ...] = DEFAULT_KEYS):
+    """
+    Returns a `create_root` component building the search tree as an `ArrayTree`,
+    for searches limited by memory rather than time. The value keys of the agent
+    are used as columns, if declared.
+    """
+
+    def array_tree(agent, state: GameState) -> ArrayNode:
+        return ArrayTree(state, agent.value_keys or keys, capacity).root
+
+    return array_tree
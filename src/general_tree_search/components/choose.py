@@ -1,38 +1,156 @@
+import heapq
 import math
+import numpy as np
 from general_tree_search.tree_search import TreeSearchAgent
 from general_tree_search.search_tree import Node
+from general_tree_search.array_tree import ArrayChildren, ArrayNode
+
+
+# number of children from which UCB1 is computed with NumPy, which only pays off
+# for many children, or when the values are read from the columns of an ArrayTree
+VECTORIZE_NODES_FROM = 64
+VECTORIZE_ARRAY_NODES_FROM = 10
 
 
 def get_choose_uct(utility_estimate: str):
+    """
+    Chooses the child maximizing UCB1, with `2 * log(N)` computed once per choice.
+    Nodes with many children are scored in one NumPy operation over arrays of their
+    counts and utility estimates, which gives exactly the same scores and ties.
+    """
+
     def choose_uct(agent: TreeSearchAgent, node: Node, children: list[Node]):
-        N = node.values["sum_count"]
+        if isinstance(children, ArrayChildren) or isinstance(children[0], ArrayNode):
+            return choose_array_nodes(node, children)
 
+        two_log_n = 2 * math.log(node.values["sum_count"])
         is_max_node = node.is_max_node()
 
-        def ucb1(c: Node):
-            exploit = c.values[utility_estimate]
+        if len(children) >= VECTORIZE_NODES_FROM:
+            counts, exploits = child_values(children)
+            if not is_max_node:
+                exploits = 1 - exploits
+            return children[np.argmax(exploits + np.sqrt(two_log_n / counts))]
+
+        best = None
+        for c in children:
+            values = c.values
+            exploit = values[utility_estimate]
+            if not is_max_node:
+                exploit = 1 - exploit
+
+            score = exploit + math.sqrt(two_log_n / values["sum_count"])
+            if best is None or score > best_score:
+                best, best_score = c, score
 
-            assert 0 <= exploit <= 1, "Invalid avg. utility!"
+        return best
 
+    def choose_array_nodes(node: ArrayNode, children: list[ArrayNode]):
+        # the columns of the tree are read by index, so that only the chosen
+        # child needs a handle
+        if isinstance(children, ArrayChildren):
+            indices = children.indices
+        else:
+            indices = [c.index for c in children]
+        counts = node.tree.columns["sum_count"]
+        estimates = node.tree.columns[utility_estimate]
+
+        two_log_n = 2 * math.log(counts.item(node.index))
+        is_max_node = node.is_max_node()
+
+        if len(indices) >= VECTORIZE_ARRAY_NODES_FROM:
+            index = np.array(indices, dtype=np.intp)
+            exploits = estimates[index]
+            if not is_max_node:
+                exploits = 1 - exploits
+            return children[np.argmax(exploits + np.sqrt(two_log_n / counts[index]))]
+
+        best = None
+        for i, index in enumerate(indices):
+            exploit = estimates.item(index)
             if not is_max_node:
                 exploit = 1 - exploit
 
-            explore = math.sqrt(2 * math.log(N) / c.values["sum_count"])
+            score = exploit + math.sqrt(two_log_n / counts.item(index))
+            if best is None or score > best_score:
+                best, best_score = i, score
 
-            return exploit + explore
+        return children[best]
 
-        return max(children, key=ucb1)
+    def child_values(children: list[Node]) -> tuple[np.ndarray, np.ndarray]:
+        counts = np.fromiter(
+            (c.values["sum_count"] for c in children), np.float64, len(children)
+        )
+        exploits = np.fromiter(
+            (c.values[utility_estimate] for c in children), np.float64, len(children)
+        )
+        return counts, exploits
 
     return choose_uct
 
 
 def get_choose_principal_variation(utility_estimate: str):
-    def choose_principal_variation(
-        agent: TreeSearchAgent, node: Node, children: list[Node]
-    ):
+    """
+    Chooses the child with the best utility estimate for the player to move, the
+    first one on ties.
+
+    The children of each node are kept in a heap ordered by the estimate, in the
+    node's `children_order`, so a choice takes O(log b) instead of a scan of all b
+    children. In a serial search of a tree, only the child chosen last and new
+    children can have changed between two choices at a node, so only they are
+    (re)inserted, and outdated entries are dropped when they reach the top.
+
+    Choices among a subset of the children (see `TreeSearchAgent.select_path`),
+    batched searches and trees with transpositions scan the children instead, and
+    discard the heap of the node.
+    """
+
+    def scan(node: Node, children: list[Node]) -> Node:
         if node.is_max_node():
             return max(children, key=lambda c: c.values[utility_estimate])
         else:
             return min(children, key=lambda c: c.values[utility_estimate])
 
+    def choose_principal_variation(
+        agent: TreeSearchAgent, node: Node, children: list[Node]
+    ):
+        if (
+            agent.transpositions
+            or agent.batch_size > 1
+            or (isinstance(node, Node) and children is not node._children)
+        ):
+            node.children_order = None
+            return scan(node, children)
+
+        # heap entries are (key, position), with the smallest key the best
+        sign = -1.0 if node.is_max_node() else 1.0
+        order = node.children_order
+        if order is None or len(order[1]) > len(children):
+            keys = [sign * c.values[utility_estimate] for c in children]
+            heap = list(zip(keys, range(len(keys))))
+            heapq.heapify(heap)
+            order = node.children_order = [heap, keys, None]
+        else:
+            heap, keys, last = order
+            if last is not None:
+                key = sign * children[last].values[utility_estimate]
+                if key != keys[last]:
+                    keys[last] = key
+                    heapq.heappush(heap, (key, last))
+            for i in range(len(keys), len(children)):
+                key = sign * children[i].values[utility_estimate]
+                keys.append(key)
+                heapq.heappush(heap, (key, i))
+
+            if len(heap) > 2 * len(keys):
+                heap[:] = list(zip(keys, range(len(keys))))
+                heapq.heapify(heap)
+
+        # entries are outdated if the key of their child changed since
+        while heap[0][0] != keys[heap[0][1]]:
+            heapq.heappop(heap)
+
+        order[2] = heap[0][1]
+        return children[order[2]]
+
     return choose_principal_variation
@@ -1,5 +1,3 @@
-import time
-
 from general_tree_search.tree_search import TreeSearchAgent
 from general_tree_search.search_tree import Node
 
@@ -7,19 +5,128 @@ from general_tree_search.search_tree import Node
 def timed_termination(time_budget: float):
     def _timed_termination(agent: TreeSearchAgent, root: Node):
         return (
-            time.process_time_ns() - agent.search_stats["start_time"]
+            agent.clock() - agent.search_stats["start_time"]
             > time_budget * 1_000_000_000
         )
 
     return _timed_termination
 
 
+def amortized_timed_termination(time_budget: float, check_interval: float = 1e-3):
+    """
+    Like `timed_termination`, but only reads the clock every few calls. The number
+    of calls between reads is calibrated from the measured time per call, so that
+    reads are about `check_interval` seconds apart, but never further apart than
+    the remaining budget. The search may overrun the budget by about one iteration.
+    """
+    budget = time_budget * 1_000_000_000
+    interval = check_interval * 1_000_000_000
+
+    def _amortized_timed_termination(agent: TreeSearchAgent, root: Node):
+        stats = agent.search_stats
+        stats["clock_countdown"] -= 1
+        if stats["clock_countdown"] > 0:
+            return False
+
+        now = agent.clock()
+        elapsed = now - stats["start_time"]
+        if elapsed > budget:
+            return True
+
+        # the first read only starts the calibration
+        if stats["clock_calls"]:
+            per_call = max(now - stats["clock_read"], 1) / stats["clock_calls"]
+            calls = min(interval, budget - elapsed) // per_call
+        else:
+            calls = 1
+        stats["clock_calls"] = stats["clock_countdown"] = max(calls, 1)
+        stats["clock_read"] = now
+        return False
+
+    return _amortized_timed_termination
+
+
+def get_counter_termination(counter: str, budget: int, count_revisits: bool = True):
+    """
+    Returns a termination component, which ends the search after `budget` units of
+    `counter` in the agent's `counts` (see `general_tree_search.counters`), counted
+    from the start of the search. Unlike timed budgets, the result does not depend
+    on the speed of the machine.
+
+    If `count_revisits` is set, iterations that expand nothing, e.g. on terminal
+    nodes, count as one unit each, so that the budget is used up even when the
+    search can no longer grow the tree.
+    """
+    key = f"{counter}_start"
+
+    def counter_termination(agent: TreeSearchAgent, root: Node):
+        stats = agent.search_stats
+        counts = agent.counts
+        used = getattr(counts, counter) - stats[key]
+        if count_revisits:
+            used += counts.revisits - stats["revisits_start"]
+        return used >= budget
+
+    return counter_termination
+
+
 def budget_termination(expansion_budget: float):
-    def _budget_termination(agent: TreeSearchAgent, root: Node):
-        return agent.search_stats["expansions"] >= expansion_budget
+    return get_counter_termination("expansions", expansion_budget)
 
-    return _budget_termination
+
+def evaluation_termination(evaluation_budget: int):
+    # iterations on terminal nodes evaluate them again, so they are counted already
+    return get_counter_termination("evaluations", evaluation_budget, False)
+
+
+def result_termination(result_budget: int):
+    return get_counter_termination("result_calls", result_budget)
+
+
+def rollout_termination(ply_budget: int):
+    """
+    Budget of moves played by `simulate`. As agents without rollouts would never
+    use it up, a ValueError is raised if `ply_budget` nodes are expanded without a
+    single rollout move.
+    """
+    plies = get_counter_termination("rollout_plies", ply_budget)
+    expansions = get_counter_termination("expansions", ply_budget, False)
+
+    def _rollout_termination(agent: TreeSearchAgent, root: Node):
+        if plies(agent, root):
+            return True
+        if (
+            expansions(agent, root)
+            and agent.counts.rollout_plies == agent.search_stats["rollout_plies_start"]
+        ):
+            raise ValueError(f"{type(agent).__name__} does not run rollouts")
+        return False
+
+    return _rollout_termination
 
 
 def if_fully_expanded(agent: TreeSearchAgent, node: Node):
     return node.is_fully_expanded()
+
+
+def get_progressive_widening(coefficient: float = 1.0, exponent: float = 0.5):
+    """
+    Returns a `should_select` component for progressive widening. A node is only
+    selected through once it has `coefficient * N ** exponent` children, for its
+    visit count N, or is fully expanded, and is expanded further otherwise. The
+    number of children thus grows with the visits, and the search of nodes with many
+    actions goes deeper instead of first expanding every sibling.
+
+    Best combined with `components.expand.get_ordered_expand`, so that the children
+    that are expanded are the most promising ones. Minimax updates need the
+    `partial` option of `components.update.get_update_minimax`, to back up values
+    through nodes that are not fully expanded.
+    """
+
+    def progressive_widening(agent: TreeSearchAgent, node: Node):
+        width = coefficient * node.values["sum_count"] ** exponent
+        if node.n_expanded >= max(width, 1):
+            return True
+        return node.is_fully_expanded()
+
+    return progressive_widening
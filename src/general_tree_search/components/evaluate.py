@@ -1,21 +1,26 @@
 import random
+import inspect
 import math
 import numpy as np
+from collections import OrderedDict
 
+from general_tree_search import counters
 from general_tree_search.tree_search import TreeSearchAgent
 from general_tree_search.search_tree import Node
 
 
 def get_additive_eval(keys: list[str], evaluate: callable):
-    def additive_eval(agent: TreeSearchAgent, node: Node):
-        value = {
-            "static_evaluation": None,
-            "utility": node.values["utility"],
-            "sum_utility": node.values["sum_utility"],
-            "sum_count": node.values["sum_count"] + 1,
-        }
+    """
+    If `evaluate` has a `batch` attribute, evaluating a list of states at once, the
+    returned component gets a `batch` attribute evaluating a list of nodes at once.
+
+    If `evaluate` is a coroutine function, so is the returned component, for use
+    with `TreeSearchAgent.search_async`.
+    """
 
-        evaluation = evaluate(node.state)
+    def add(value, evaluation):
+        value["static_evaluation"] = None
+        value["sum_count"] += 1
 
         for key in keys:
             value[key] += evaluation
@@ -24,19 +29,35 @@ def get_additive_eval(keys: list[str], evaluate: callable):
 
         return value
 
+    def additive_eval(agent: TreeSearchAgent, node: Node):
+        return add(node.values, evaluate(node.state))
+
+    def additive_eval_batch(agent: TreeSearchAgent, nodes: list[Node]):
+        evaluations = evaluate.batch([node.state for node in nodes])
+        for node, evaluation in zip(nodes, evaluations):
+            add(node.values, evaluation)
+
+    async def additive_eval_async(agent: TreeSearchAgent, node: Node):
+        return add(node.values, await evaluate(node.state))
+
+    if inspect.iscoroutinefunction(evaluate):
+        return additive_eval_async
+
+    if hasattr(evaluate, "batch"):
+        additive_eval.batch = additive_eval_batch
+
     return additive_eval
 
 
 def get_setter_eval(keys: list[str], evaluate: callable):
-    def setter_eval(agent: TreeSearchAgent, node: Node):
-        value = {
-            "static_evaluation": None,
-            "utility": node.values["utility"],
-            "sum_utility": node.values["sum_utility"],
-            "sum_count": node.values["sum_count"] + 1,
-        }
+    """
+    Like `get_additive_eval`, the returned component gets a `batch` attribute if
+    `evaluate` has one, and is a coroutine function if `evaluate` is.
+    """
 
-        evaluation = evaluate(node.state)
+    def assign(value, evaluation):
+        value["static_evaluation"] = None
+        value["sum_count"] += 1
 
         for key in keys:
             value[key] = evaluation
@@ -45,14 +66,114 @@ def get_setter_eval(keys: list[str], evaluate: callable):
 
         return value
 
+    def setter_eval(agent: TreeSearchAgent, node: Node):
+        return assign(node.values, evaluate(node.state))
+
+    def setter_eval_batch(agent: TreeSearchAgent, nodes: list[Node]):
+        evaluations = evaluate.batch([node.state for node in nodes])
+        for node, evaluation in zip(nodes, evaluations):
+            assign(node.values, evaluation)
+
+    async def setter_eval_async(agent: TreeSearchAgent, node: Node):
+        return assign(node.values, await evaluate(node.state))
+
+    if inspect.iscoroutinefunction(evaluate):
+        return setter_eval_async
+
+    if hasattr(evaluate, "batch"):
+        setter_eval.batch = setter_eval_batch
+
     return setter_eval
 
 
+# marks cache misses, as evaluations may be None
+MISSING = object()
+
+
+def get_cached_evaluation(evaluate: callable, max_size: int = 100_000):
+    """
+    Memoizes `evaluate`, a function of a state like `static_evaluation`, by
+    `GameState.key`, so positions reached by another move order, or again in a later
+    search, are not evaluated again. At most `max_size` evaluations are kept, and
+    the least recently used one is evicted first. Note that a cached `simulate`
+    returns the first rollout of a position every time.
+
+    The `stats` attribute of the returned function counts hits and misses, and its
+    `clear` attribute empties the cache and resets the counts. The `batch`
+    attribute and coroutine functions are supported, as in `get_additive_eval`.
+    """
+    cache = OrderedDict()
+    stats = {"hits": 0, "misses": 0}
+
+    def lookup(key):
+        try:
+            value = cache[key]
+            cache.move_to_end(key)
+        except KeyError:
+            stats["misses"] += 1
+            return MISSING
+        stats["hits"] += 1
+        return value
+
+    def store(key, value):
+        cache[key] = value
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+
+    def clear():
+        cache.clear()
+        stats["hits"] = stats["misses"] = 0
+
+    def cached_evaluation(state):
+        key = state.key()
+        value = lookup(key)
+        if value is MISSING:
+            value = evaluate(state)
+            store(key, value)
+        return value
+
+    def cached_evaluation_batch(states):
+        keys = [state.key() for state in states]
+        values = [lookup(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is MISSING]
+        if missing:
+            evaluations = evaluate.batch([states[i] for i in missing])
+            for i, value in zip(missing, evaluations):
+                values[i] = value
+                store(keys[i], value)
+        return values
+
+    async def cached_evaluation_async(state):
+        key = state.key()
+        value = lookup(key)
+        if value is MISSING:
+            value = await evaluate(state)
+            store(key, value)
+        return value
+
+    if inspect.iscoroutinefunction(evaluate):
+        cached_evaluation_async.stats = stats
+        cached_evaluation_async.clear = clear
+        return cached_evaluation_async
+
+    if hasattr(evaluate, "batch"):
+        cached_evaluation.batch = cached_evaluation_batch
+
+    cached_evaluation.stats = stats
+    cached_evaluation.clear = clear
+    return cached_evaluation
+
+
 def simulate(state):
+    plies = 0
     while not state.is_terminal:
         action = random.choice(state.applicable_actions)
         state = state.result(action)
+        plies += 1
 
+    counts = counters.current()
+    counts.result_calls += plies
+    counts.rollout_plies += plies
     return state.utility
 
 
@@ -86,6 +207,137 @@ def static_evaluation(state):
             assert False, "Unknown game!!"
 
 
+def game_name(state):
+    return state.state.get_game().to_string().split("(")[0]
+
+
+def static_evaluation_batch(states):
+    """
+    Batch form of `static_evaluation`. Non-terminal states of the same game are
+    evaluated with a single vectorized call, if the game has a batch evaluation.
+    """
+    evaluations = [None] * len(states)
+    groups = {}
+    for i, state in enumerate(states):
+        if state.is_terminal:
+            evaluations[i] = state.utility
+        else:
+            groups.setdefault(game_name(state), []).append(i)
+
+    for name, indices in groups.items():
+        if name not in BATCH_EVALUATIONS:
+            for i in indices:
+                evaluations[i] = static_evaluation(states[i])
+            continue
+
+        shape = states[indices[0]].state.get_game().observation_tensor_shape()
+        observations = np.array(
+            [states[i].state.observation_tensor() for i in indices]
+        ).reshape((len(indices), *shape))
+
+        batch = BATCH_EVALUATIONS[name]([states[i] for i in indices], observations)
+        for i, evaluation in zip(indices, batch):
+            evaluations[i] = evaluation
+
+    return evaluations
+
+
+static_evaluation.batch = static_evaluation_batch
+
+
+def logistic(score_max, score_min):
+    return 1 / (1 + np.exp(score_min - score_max))
+
+
+def static_evaluation_breakthrough_batch(states, observations):
+    weights_max = (np.arange(8) + 5).reshape((-1, 1))
+    weights_min = (np.arange(8)[::-1] + 5).reshape((-1, 1))
+
+    score_max = np.sum(weights_max * observations[:, 0], axis=(1, 2))
+    score_min = np.sum(weights_min * observations[:, 1], axis=(1, 2))
+
+    return logistic(score_max, score_min)
+
+
+def static_evaluation_clobber_batch(states, observations):
+    score_max = np.sum(observations[:, 1], axis=(1, 2))
+    score_min = np.sum(observations[:, 0], axis=(1, 2))
+
+    return logistic(score_max, score_min)
+
+
+def static_evaluation_checkers_batch(states, observations):
+    men_max = np.sum(observations[:, 0], axis=(1, 2))
+    kings_max = np.sum(observations[:, 1], axis=(1, 2))
+
+    kings_min = np.sum(observations[:, 2], axis=(1, 2))
+    men_min = np.sum(observations[:, 3], axis=(1, 2))
+
+    return logistic(men_max + 5 * kings_max, men_min + 5 * kings_min)
+
+
+def static_evaluation_lines_of_action_batch(states, observations):
+    center_max = np.sum(observations[:, 0, 2:-2, 2:-2], axis=(1, 2))
+    center_min = np.sum(observations[:, 1, 2:-2, 2:-2], axis=(1, 2))
+
+    return logistic(center_max, center_min)
+
+
+def static_evaluation_pentago_batch(states, observations):
+    weights = {2: 1, 3: 5, 4: 13}
+
+    counts_max = count_lines_batch(observations[:, 1], [2, 3, 4])
+    counts_min = count_lines_batch(observations[:, 0], [2, 3, 4])
+
+    score_max = sum(weights[c] * counts_max[c] for c in counts_max)
+    score_min = sum(weights[c] * counts_min[c] for c in counts_min)
+
+    return logistic(score_max, score_min)
+
+
+def static_evaluation_connect_four_batch(states, observations):
+    weights = {2: 1, 3: 5}
+
+    counts_max = count_lines_batch(observations[:, 0], [2, 3])
+    counts_min = count_lines_batch(observations[:, 1], [2, 3])
+
+    score_max = sum(weights[c] * counts_max[c] for c in counts_max)
+    score_min = sum(weights[c] * counts_min[c] for c in counts_min)
+
+    return logistic(score_max, score_min)
+
+
+def static_evaluation_y_batch(states, observations):
+    player = np.array([state.moves % 2 for state in states])
+    index = np.arange(len(states))
+    boards = observations[index, player] - observations[index, 1 - player]
+
+    return np.clip((reduce_y(boards) + 1) * 0.5, 0, 1)
+
+
+def static_evaluation_oware_batch(states, observations):
+    points_max = observations[:, 12]
+    points_min = observations[:, 13]
+
+    controlled_max = np.sum(observations[:, :6], axis=1)
+    controlled_min = np.sum(observations[:, 6:12], axis=1)
+
+    return logistic(controlled_max + 50 * points_max, controlled_min + 50 * points_min)
+
+
+# games whose static evaluation has a vectorized batch form
+BATCH_EVALUATIONS = {
+    "breakthrough": static_evaluation_breakthrough_batch,
+    "clobber": static_evaluation_clobber_batch,
+    "checkers": static_evaluation_checkers_batch,
+    "lines_of_action": static_evaluation_lines_of_action_batch,
+    "oware": static_evaluation_oware_batch,
+    "pentago": static_evaluation_pentago_batch,
+    "connect_four": static_evaluation_connect_four_batch,
+    "y": static_evaluation_y_batch,
+}
+
+
 def static_evaluation_breakthrough(state, observation):
     weights_max = (np.arange(8) + 5).reshape((-1, 1))
     weights_min = (np.arange(8)[::-1] + 5).reshape((-1, 1))
@@ -164,62 +416,89 @@ def static_evaluation_connect_four(state, observation):
 
 
 def count_lines(board, lengths_to_count):
+    """
+    Counts the maximal runs of exactly k ones in the rows, columns and diagonals of
+    `board`, for each length k in `lengths_to_count`.
+    """
     H, W = board.shape
-    counts = {length: 0 for length in lengths_to_count}
-
-    def scan_line(arr):
-        # Count contiguous runs of 1s in a 1D array
-        if len(arr) == 0:
-            return
-        dif = np.diff(arr)
-        idx = np.where(dif != 0)[0] + 1
-        segments = np.split(arr, idx)
-        for seg in segments:
-            k = len(seg)
-            if k in counts and np.all(seg == 1):
-                counts[k] += 1
-
-    # horizontal
-    for r in range(H):
-        scan_line(board[r])
-
-    # vertical
-    for c in range(W):
-        scan_line(board[:, c])
-
-    # main diagonals
-    for d in range(-(H-1), W):
-        diag = board.diagonal(offset=d)
-        scan_line(diag)
-
-    # anti-diagonals
-    flipped = np.fliplr(board)
-    for d in range(-(H-1), W):
-        diag = flipped.diagonal(offset=d)
-        scan_line(diag)
-
-    return counts
+    bits = int.from_bytes(line_bitboard(board).tobytes(), "little")
+    shifts = (1, W, W + 1, W + 2)
+
+    return {
+        length: sum(run_starts(bits, shift, length).bit_count() for shift in shifts)
+        for length in lengths_to_count
+    }
+
+
+def count_lines_batch(boards, lengths_to_count):
+    """
+    Batch form of `count_lines`, returning an array of counts for each length.
+    Boards with more than 64 cells, including padding, are counted one by one.
+    """
+    n, H, W = boards.shape
+    if H * (W + 1) > 64:
+        counts = [count_lines(board, lengths_to_count) for board in boards]
+        return {k: np.array([c[k] for c in counts]) for k in lengths_to_count}
+
+    packed = np.zeros((n, 8), dtype=np.uint8)
+    packed[:, : (H * (W + 1) + 7) // 8] = line_bitboard(boards)
+    bits = packed.view("<u8")[:, 0]
+    shifts = (1, W, W + 1, W + 2)
+
+    return {
+        length: sum(
+            np.bitwise_count(run_starts(bits, shift, length)).astype(np.int64)
+            for shift in shifts
+        )
+        for length in lengths_to_count
+    }
+
+
+def line_bitboard(boards):
+    """
+    Packs the ones of the last two axes into little-endian bits, row by row, with
+    an empty cell after each row, so that runs never continue into the next row.
+    Moving one cell right, down-left, down and down-right is then a shift of the
+    bit index by 1, W, W + 1 and W + 2.
+    """
+    *batch, H, W = boards.shape
+    padded = np.zeros((*batch, H, W + 1), dtype=bool)
+    padded[..., :W] = boards == 1
+    return np.packbits(padded.reshape((*batch, -1)), axis=-1, bitorder="little")
+
+
+def run_starts(bits, shift, length):
+    """
+    Returns the bits starting a run of exactly `length` set bits, spaced `shift`
+    apart, for bitboards given as Python ints or arrays of unsigned ints.
+    """
+    # the preceding cell is empty
+    runs = bits & ~(bits << shift)
+    for i in range(1, length):
+        runs &= bits >> (i * shift)
+    # and so is the cell following the run
+    return runs & ~(bits >> (length * shift))
 
 
 def static_evaluation_y(state, observation):
-    N = observation.shape[1]
     player = state.moves % 2
-    board_max = observation[player]
-    board_min = observation[1 - player]
+    board = observation[player] - observation[1 - player]
 
-    board = board_max - board_min
+    return max(min((reduce_y(board) + 1) * 0.5, 1), 0)
 
-    for size in range(N - 1, 0, -1):
-        new_board = np.zeros((size, size))
-        for i in range(size):
-            for j in range(size - i):
-                p1 = board[i, j]
-                p2 = board[i, j + 1]
-                p3 = board[i + 1, j]
 
-                new_board[i, j] = 0.5 * (p1 + p2 + p3 - p1*p2*p3)
-        
-        board = new_board
+def reduce_y(boards):
+    """
+    Reduces Y boards over the last two axes to a single cell, combining each cell
+    with its right and lower neighbours at every level. Each level is computed as
+    whole arrays; cells outside the upper-left triangle are not zeroed, as they are
+    never combined into the triangle at the next level.
+    """
+    for size in range(boards.shape[-1] - 1, 0, -1):
+        p1 = boards[..., :size, :size]
+        p2 = boards[..., :size, 1 : size + 1]
+        p3 = boards[..., 1 : size + 1, :size]
 
+        boards = 0.5 * (p1 + p2 + p3 - p1 * p2 * p3)
 
-    return max(min((board[0, 0] + 1) * 0.5, 1), 0)
+    return boards[..., 0, 0]
@@ -0,0 +1,94 @@
+from general_tree_search import counters
+from general_tree_search.tree_search import TreeSearchAgent
+from general_tree_search.search_tree import Node
+
+
+def transposition_expand(agent: TreeSearchAgent, node: Node) -> list[Node]:
+    """
+    Expands a single child like `single_expand`, but if the resulting state is
+    already in the tree, the existing node is linked as a child instead, turning
+    the search tree into a DAG of unique states. The linked node is not evaluated
+    again, so nothing is returned in that case.
+
+    States are identified by `GameState.key`, and looked up in `agent.transpositions`.
+    Only nodes at the same depth are linked, which keeps the graph acyclic.
+    Requires the default `Node` tree.
+    """
+    if node.state.is_terminal or node.is_fully_expanded():
+        counters.current().revisits += 1
+        return [node]
+
+    table = agent.transpositions
+    if not table:
+        table[node.state.key()] = node
+
+    action = node.pop_action()
+    state = node.state.result(action)
+    counters.current().result_calls += 1
+    key = state.key()
+
+    existing = table.get(key)
+    if existing is not None and existing.depth == node.depth + 1:
+        node.add_transposition(existing)
+        return []
+
+    child = node.add_child(state, action)
+    table[key] = child
+    return [child]
+
+
+def full_expand(agent: TreeSearchAgent, node: Node) -> list[Node]:
+    """
+    Expands all remaining children of `node` at once, so they are evaluated and
+    backpropagated together, paying the selection walk once per expanded node
+    instead of once per child.
+    """
+    if node.state.is_terminal or node.is_fully_expanded():
+        counters.current().revisits += 1
+        return [node]
+
+    return [node.add_child(None, node.pop_action()) for _ in node.unexpanded_actions]
+
+
+def get_ordered_expand(priority: callable):
+    """
+    Expands a single child like `single_expand`, but in order of decreasing
+    `priority(state, action)`, e.g. from move ordering heuristics or priors, instead
+    of the order of the applicable actions. The priorities of the actions of a node
+    are computed once, on its first expansion, and the order is kept in the node.
+
+    Combined with `components.control.get_progressive_widening`, only the most
+    promising children of nodes with many actions are searched.
+    """
+
+    def ordered_expand(agent: TreeSearchAgent, node: Node) -> list[Node]:
+        if node.state.is_terminal or node.is_fully_expanded():
+            counters.current().revisits += 1
+            return [node]
+
+        order = node.action_order
+        if order is None:
+            state = node.state
+            # ascending, as actions are expanded from the back
+            order = sorted(state.applicable_actions, key=lambda a: priority(state, a))
+            node.action_order = order
+
+        action = order[len(order) - 1 - node.n_expanded]
+        node.pop_action()
+        return [node.add_child(None, action)]
+
+    return ordered_expand
+
+
+def get_evaluation_priority(evaluate: callable):
+    """
+    Returns a priority for `get_ordered_expand`, given by `evaluate` of the
+    resulting state, from the point of view of the player to move.
+    """
+
+    def evaluation_priority(state, action) -> float:
+        value = evaluate(state.result(action))
+        counters.current().result_calls += 1
+        return value if state.moves % 2 == 0 else 1 - value
+
+    return evaluation_priority
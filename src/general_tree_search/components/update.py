@@ -1,29 +1,97 @@
 from general_tree_search.tree_search import TreeSearchAgent
-from general_tree_search.search_tree import Node
+from general_tree_search.search_tree import Node, children
 
 
 def get_update_sum(key: str):
     def update_sum(agent: TreeSearchAgent, node: Node, children: list[Node]) -> dict:
-        values = node.values.copy()
-        values["sum_count"] += 1
+        values = node.values
+        if agent.transpositions and children:
+            # shared nodes are counted once per parent in the sums of a DAG,
+            # so the count is derived from the children as well
+            values["sum_count"] = 1 + sum(c.values["sum_count"] for c in children)
+        else:
+            values["sum_count"] += 1
 
         values["sum_utility"] = (
-            sum(c.values["sum_utility"] for c in children) + node.values[key]
+            sum(c.values["sum_utility"] for c in children) + values[key]
         )
 
         values["avg_utility"] = values["sum_utility"] / values["sum_count"]
 
         return values
 
+    def collapse_sum(agent: TreeSearchAgent, node: Node):
+        values = node.values
+        if agent.transpositions:
+            # counts are derived from the children in a DAG, so the removed
+            # statistics are kept as a single sample of their average
+            values[key] = values["avg_utility"]
+            values["sum_utility"] = values["avg_utility"]
+            values["sum_count"] = 1.0
+        else:
+            # the utility of the removed children becomes part of the node's own
+            values[key] = values["sum_utility"]
+
+    def incremental_sum(agent: TreeSearchAgent, node: Node, delta: float | None):
+        """
+        Updates `node` after the sum utility of one of its children changed by
+        `delta`, in constant time, returning the change of its own sum utility.
+        If `delta` is None, the node is updated in full instead.
+
+        The result is not bit-identical to `update_sum`, which adds up the
+        children in order, as floating point addition is not associative. Each
+        update adds a rounding error of at most a unit in the last place of the
+        sum, so the errors grow with the number of updates. With BF_SUM on Connect
+        Four, the sum utilities differ from the full sums by less than
+        `25 * sum_count * 2**-52` after 5000 iterations. Searches stay the same as
+        long as no choice depends on such a difference: with MC_EV, the trees
+        agree after 400 iterations, but not after 5000.
+        """
+        values = node.values
+        if delta is None:
+            before = values["sum_utility"]
+            update_sum(agent, node, children(node))
+            return values["sum_utility"] - before
+
+        values["sum_count"] += 1
+        values["sum_utility"] += delta
+        values["avg_utility"] = values["sum_utility"] / values["sum_count"]
+
+        return delta
+
+    def merge_sum(agent: TreeSearchAgent, values: list[dict]) -> dict:
+        """
+        Merges the values of the same node from independent searches.
+        """
+        merged = dict(max(values, key=lambda v: v["sum_count"]).items())
+        for k in ("sum_count", "sum_utility", key):
+            merged[k] = sum(v[k] for v in values)
+        merged["avg_utility"] = merged["sum_utility"] / merged["sum_count"]
+        return merged
+
+    update_sum.collapse = collapse_sum
+    update_sum.incremental = incremental_sum
+    update_sum.merge = merge_sum
+
     return update_sum
 
 
-def get_update_minimax(key: str):
+def get_update_minimax(key: str, partial: bool = False):
+    """
+    Values are backed up from the children once a node is fully expanded. If
+    `partial` is set, they are backed up from the existing children of any node
+    with children, as needed with `components.control.get_progressive_widening`,
+    under which most interior nodes are never fully expanded.
+    """
+
+    def backs_up(node: Node) -> bool:
+        return partial or node.is_fully_expanded()
+
     def update_minimax(
         agent: TreeSearchAgent, node: Node, children: list[Node]
     ) -> dict:
-        values = node.values.copy()
-        if node.is_fully_expanded() and children:
+        values = node.values
+        if backs_up(node) and children:
             if node.is_max_node():
                 static_evaluation = max(c.values[key] for c in children)
             else:
@@ -38,4 +106,58 @@ def get_update_minimax(key: str):
 
         return values
 
+    def incremental_minimax(agent: TreeSearchAgent, node: Node, delta):
+        """
+        Updates `node` after the value of one of its children changed, returning
+        the change of its own value as the node and its previous value, or False
+        if the value did not change. If `delta` is False, only the counters of
+        `node` are updated. If `delta` is None, the node is updated in full.
+
+        The best child of a node is the child whose value equals the node's, so
+        the children are only rescanned when the best child gets worse.
+        """
+        values = node.values
+        before = values[key]
+        if delta is None:
+            update_minimax(agent, node, children(node))
+            return (node, before) if values[key] != before else False
+
+        static_evaluation = before
+        if delta and backs_up(node):
+            child, child_before = delta
+            value = child.values[key]
+            if node.is_max_node():
+                if value >= before:
+                    static_evaluation = value
+                elif child_before == before:
+                    static_evaluation = max(c.values[key] for c in children(node))
+            else:
+                if value <= before:
+                    static_evaluation = value
+                elif child_before == before:
+                    static_evaluation = min(c.values[key] for c in children(node))
+
+        values["sum_count"] += 1
+        values["avg_utility"] = values["sum_utility"] / values["sum_count"]
+
+        values[key] = static_evaluation
+
+        return (node, before) if static_evaluation != before else False
+
+    def merge_minimax(agent: TreeSearchAgent, values: list[dict]) -> dict:
+        """
+        Merges the values of the same node from independent searches. The minimax
+        value is taken from the search that visited the node the most.
+        """
+        merged = dict(max(values, key=lambda v: v["sum_count"]).items())
+        static_evaluation = merged[key]
+        merged["sum_count"] = sum(v["sum_count"] for v in values)
+        merged["sum_utility"] = sum(v["sum_utility"] for v in values)
+        merged["avg_utility"] = merged["sum_utility"] / merged["sum_count"]
+        merged[key] = static_evaluation
+        return merged
+
+    update_minimax.incremental = incremental_minimax
+    update_minimax.merge = merge_minimax
+
     return update_minimax
@@ -0,0 +1,64 @@
+"""
+Counts of the work done by searches, which do not depend on the speed of the
+machine. They are used by the deterministic budgets in `components.control`.
+
+Each agent keeps its own `Counters` in `TreeSearchAgent.counts`. While the agent
+searches, they are the current counters of the thread or asyncio task running the
+search (see `counting`), which the trees, expand components and `simulate` add to.
+So searches of other agents, including opponents and agents pondering in another
+thread, never use up each other's budgets. Work done outside of any search is
+counted in a separate set of counters.
+
+- `expansions`: children added to nodes of a search tree, including links to
+  transpositions.
+- `evaluations`: leaves evaluated by the search loops, with any evaluate component.
+- `result_calls`: `GameState.result` calls made by the trees, `transposition_expand`
+  and `simulate`.
+- `rollout_plies`: moves played by `simulate`.
+- `revisits`: expansions of nodes that cannot be expanded, typically because they
+  are terminal, which add nothing to the tree.
+
+The counts of an agent are never reset, the budgets measure them relative to the
+start of a search.
+"""
+
+import contextlib
+import contextvars
+
+NAMES = ("expansions", "evaluations", "result_calls", "rollout_plies", "revisits")
+
+
+class Counters:
+    __slots__ = NAMES
+
+    def __init__(self):
+        for name in NAMES:
+            setattr(self, name, 0)
+
+    def __repr__(self):
+        counts = ", ".join(f"{name}={getattr(self, name)}" for name in NAMES)
+        return f"Counters({counts})"
+
+    def move_to(self, other: "Counters"):
+        """Adds these counts to `other`, and resets them."""
+        for name in NAMES:
+            setattr(other, name, getattr(other, name) + getattr(self, name))
+            setattr(self, name, 0)
+
+
+_current = contextvars.ContextVar("counters", default=Counters())
+
+
+def current() -> Counters:
+    """Returns the counters of the search running in this thread or task."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def counting(counters: Counters):
+    """Makes `counters` the current counters while the block runs."""
+    token = _current.set(counters)
+    try:
+        yield counters
+    finally:
+        _current.reset(token)
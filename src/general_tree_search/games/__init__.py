@@ -28,5 +28,10 @@ class PySpielState:
 
         return PySpielState(new_state, self.moves + 1)
 
+    def key(self):
+        # serialize() returns the action history, so the position string is used
+        # to let transposed positions share a key
+        return self.moves, self.state.current_player(), str(self.state)
+
     def __repr__(self):
         return repr(self.state)
\ No newline at end of file
@@ -13,3 +13,10 @@ class GameState[T: Hashable](Protocol):
 
     @abstractmethod
     def result(self, action: T) -> "GameState[T]": ...
+
+    @abstractmethod
+    def key(self) -> Hashable:
+        """
+        Hashable key identifying the position, equal for states reached by
+        different action sequences.
+        """
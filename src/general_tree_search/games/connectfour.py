@@ -202,6 +202,12 @@ class ConnectFourState:
             self.result_delay,
         )
 
+    def key(self) -> int:
+        """
+        Unique key of the position, combining the two bitboards.
+        """
+        return self.player_mask << (self.height + 1) * self.width | self.piece_mask
+
     def apply_many(self, action_string: str) -> "ConnectFourState":
         """
         Applies the result function for each action in action_string.
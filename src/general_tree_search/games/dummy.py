@@ -24,6 +24,9 @@ class DummyState:
     def __repr__(self):
         return f"DummyState[{self.position}]"
 
+    def key(self):
+        return self.position, self.moves
+
     def result(self, action):
         new_pos = DummyState.results[(self.position, action)]
         return DummyState(new_pos, self.moves + 1)
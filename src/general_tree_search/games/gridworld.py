@@ -78,6 +78,9 @@ class GridWorldState:
                 actions.append(action)
         return actions
 
+    def key(self):
+        return self.player_position
+
     def result(self, action: Direction):
         dx, dy = action.value
         x, y = self.player_position
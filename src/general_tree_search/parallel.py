@@ -0,0 +1,347 @@
+import os
+import sys
+import copy
+import time
+import random
+import threading
+import multiprocessing as mp
+from collections import defaultdict
+
+from general_tree_search import counters
+from general_tree_search.tree_search import TreeSearchAgent
+from general_tree_search.search_tree import Node, ancestors, children, detached_copy
+from general_tree_search.games import GameState
+
+# statistics counting the work of a search, which are summed over the workers
+SUMMED_STATS = (
+    "iterations",
+    "ponder_iterations",
+    "evicted_nodes",
+    "terminal_hits",
+    "selections",
+    "selection_depth_total",
+    *counters.NAMES,
+)
+
+
+def _search_worker(agent_type, agent_args, seed, connection):
+    random.seed(seed)
+    agent = agent_type(**agent_args)
+
+    while (state := connection.recv()) is not None:
+        root = agent.search(state)
+        connection.send(
+            (
+                dict(root.values.items()),
+                [(c.generating_action, dict(c.values.items())) for c in children(root)],
+                dict(agent.search_stats),
+            )
+        )
+
+
+class RootParallelAgent:
+    """
+    Root parallelization of a `TreeSearchAgent` type.
+
+    Each call to `search` runs an independent search of the same state in each of
+    `n_workers` worker processes, under the agent's own termination condition, and
+    returns a root whose children hold the merged statistics of the searches. The
+    values of a node are merged by the `merge` attribute of the update component
+    (see `components.update`), or taken from the search that visited it the most.
+
+    Workers are started once, and keep their agent between searches, so options
+    such as `reuse_tree` apply per worker. Since agent types and their components
+    are created at runtime, and cannot be pickled, the workers are forked.
+
+    The start and end times in `search_stats` are wall-clock times read in this
+    process, and the statistics counting work, such as `iterations`, are summed
+    over the workers. The statistics of each worker are kept in `worker_stats`.
+    """
+
+    def __init__(
+        self, agent_type: type[TreeSearchAgent], n_workers: int | None = None, **kwargs
+    ):
+        self.agent = agent_type(**kwargs)
+        self.n_workers = n_workers or os.cpu_count()
+        self.search_stats = defaultdict(float)
+        self.worker_stats: list[dict] = []
+
+        context = mp.get_context("fork")
+        self.connections = []
+        self.workers = []
+        for _ in range(self.n_workers):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(
+                target=_search_worker,
+                args=(agent_type, kwargs, random.getrandbits(64), worker_connection),
+                daemon=True,
+            )
+            worker.start()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, state: GameState) -> Node:
+        assert not state.is_terminal, "Cannot search terminal states!"
+
+        self.search_stats.clear()
+        self.search_stats["start_time"] = time.perf_counter_ns()
+
+        for connection in self.connections:
+            connection.send(state)
+        results = [connection.recv() for connection in self.connections]
+
+        self.search_stats["end_time"] = time.perf_counter_ns()
+        self.worker_stats = [search_stats for _, _, search_stats in results]
+        for key in SUMMED_STATS:
+            values = [stats[key] for stats in self.worker_stats if key in stats]
+            if values:
+                self.search_stats[key] = sum(values)
+        if self.search_stats.get("selections"):
+            self.search_stats["selection_depth_max"] = max(
+                stats["selection_depth_max"] for stats in self.worker_stats
+            )
+            self.search_stats["selection_depth_avg"] = (
+                self.search_stats["selection_depth_total"]
+                / self.search_stats["selections"]
+            )
+
+        child_values = {}
+        for _, children_values, _ in results:
+            for action, values in children_values:
+                child_values.setdefault(action, []).append(values)
+
+        root = self.agent.create_root(state)
+        self._set_values(root, [values for values, _, _ in results])
+        for action, values in child_values.items():
+            self._set_values(root.add_child(None, action), values)
+
+        return root
+
+    def get_solution(self, root: Node):
+        return self.agent.get_solution(root)
+
+    def close(self):
+        for connection, worker in zip(self.connections, self.workers):
+            connection.send(None)
+            worker.join()
+        self.connections = []
+        self.workers = []
+
+    def _set_values(self, node: Node, values: list[dict]):
+        merge = getattr(self.agent.update, "merge", None)
+        if merge is not None:
+            merged = merge(self.agent, values)
+        else:
+            merged = max(values, key=lambda v: v["sum_count"])
+
+        for key, value in merged.items():
+            node.values[key] = value
+
+
+# number of locks shared by the nodes of a tree during backpropagation
+NODE_LOCKS = 64
+
+
+class TreeParallelAgent:
+    """
+    Tree parallelization of a `TreeSearchAgent` type.
+
+    Each call to `search` runs `n_threads` threads, which share one search tree.
+    Selection and expansion hold a lock on the tree, while the leaves are evaluated
+    without it. Leaves are evaluated on detached copies, whose values are written
+    back with the lock. Backpropagation only locks each node while it is updated,
+    with one of `NODE_LOCKS` locks picked by the hash of the node, so threads can
+    backpropagate and select at the same time. The nodes are updated in full, as
+    the `incremental` attribute of an update component assumes that the children
+    do not change in between; a single thread uses the agent's own backpropagation.
+
+    Leaves under evaluation are excluded from selection, and each node on the path
+    to them counts as `virtual_loss` lost visits for the player choosing it, until
+    they are backpropagated, so the threads spread out over the tree. The choose
+    component is given copies of these nodes, with `sum_count` increased by the
+    lost visits, and the `utility_estimates` moved towards a loss, 0 for the max
+    player or 1 for the min player, as if the lost visits were averaged in. The
+    values in the tree are not changed by virtual losses.
+
+    Without a given `n_threads`, one thread is used per core on free-threaded
+    builds, and a single thread otherwise, which gives the serial search. The
+    default `Node` tree is required, and `max_nodes` is not applied. The work of
+    the threads is added to the agent's `counts` under the lock. The agent's
+    `clock` is replaced by wall-clock time, since the CPU time of the process
+    would use up timed budgets once per thread.
+    """
+
+    def __init__(
+        self,
+        agent_type: type[TreeSearchAgent],
+        n_threads: int | None = None,
+        virtual_loss: int = 1,
+        utility_estimates: tuple[str, ...] = ("avg_utility", "static_evaluation"),
+        **kwargs,
+    ):
+        self.agent = agent_type(**kwargs)
+        self.agent.clock = time.perf_counter_ns
+        self.search_stats = self.agent.search_stats
+
+        if n_threads is None:
+            gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+            n_threads = 1 if gil_enabled else os.cpu_count()
+        self.n_threads = n_threads
+        self.virtual_loss = virtual_loss
+        self.utility_estimates = utility_estimates
+
+        self.lock = threading.Lock()
+        self.backpropagated = threading.Condition(self.lock)
+        self.node_locks = [threading.Lock() for _ in range(NODE_LOCKS)]
+
+    def search(self, state: GameState) -> Node:
+        assert not state.is_terminal, "Cannot search terminal states!"
+
+        agent = self.agent
+        with counters.counting(agent.counts):
+            root = agent.init_tree(state)
+        pending = set()
+        # nodes on the paths to pending leaves, with the number of such paths
+        visits = {}
+
+        self.search_stats.clear()
+        self.search_stats["start_time"] = agent.clock()
+        agent.start_counts()
+
+        threads = [
+            threading.Thread(target=self._search_thread, args=(root, pending, visits))
+            for _ in range(self.n_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.search_stats["end_time"] = agent.clock()
+        self.search_stats["threads"] = self.n_threads
+        agent.end_counts()
+
+        return root
+
+    def get_solution(self, root: Node):
+        return self.agent.get_solution(root)
+
+    def _search_thread(self, root: Node, pending: set[Node], visits: dict[Node, int]):
+        # each thread counts its work separately, and adds it to the counts of the
+        # agent while holding the lock
+        with counters.counting(counters.Counters()) as counts:
+            self._search_loop(root, pending, visits, counts)
+
+    def _search_loop(
+        self,
+        root: Node,
+        pending: set[Node],
+        visits: dict[Node, int],
+        counts: counters.Counters,
+    ):
+        agent = self.agent
+
+        while True:
+            with self.lock:
+                if agent.should_terminate(root):
+                    return
+
+                path = self._select_path(root, pending, visits)
+                if path is None:
+                    # every candidate is being evaluated by another thread
+                    self.backpropagated.wait()
+                    continue
+                node = path[-1]
+                leaves = agent.expand(node)
+                counts.move_to(agent.counts)
+
+                pending.update(leaves)
+                for n in path[1:]:
+                    visits[n] = visits.get(n, 0) + 1
+
+            # leaves are evaluated on detached copies, so other threads never
+            # see partially evaluated values
+            copies = [detached_copy(child) for child in leaves]
+            for copy in copies:
+                copy.values = agent.evaluate(copy)
+
+            with self.lock:
+                for child, copy in zip(leaves, copies):
+                    for key, value in copy.values.items():
+                        child.values[key] = value
+                counts.evaluations += len(leaves)
+                counts.move_to(agent.counts)
+
+            self._backpropagate(node, max(len(leaves), 1))
+
+            with self.lock:
+                pending.difference_update(leaves)
+                for n in path[1:]:
+                    visits[n] -= 1
+                    if not visits[n]:
+                        del visits[n]
+
+                self.search_stats["iterations"] += 1
+                self.backpropagated.notify_all()
+
+    def _select_path(
+        self, root: Node, pending: set[Node], visits: dict[Node, int]
+    ) -> list[Node] | None:
+        """
+        `TreeSearchAgent.select_path`, with the virtual losses of the children.
+        """
+        agent = self.agent
+        node = root
+        path = [node]
+        while agent.should_select(node) and not node.state.is_terminal:
+            candidates = [c for c in children(node) if c not in pending]
+            if not candidates:
+                return None
+
+            if self.virtual_loss and any(c in visits for c in candidates):
+                loss = 0.0 if node.is_max_node() else 1.0
+                views = [
+                    self._virtual_loss_view(c, visits[c], loss) if c in visits else c
+                    for c in candidates
+                ]
+                view = agent.choose(node, views)
+                node = candidates[next(i for i, v in enumerate(views) if v is view)]
+            else:
+                node = agent.choose(node, candidates)
+            path.append(node)
+
+        if node in pending:
+            return None
+        return path
+
+    def _virtual_loss_view(self, node: Node, visits: int, loss: float) -> Node:
+        view = copy.copy(node)
+        values = view.values = dict(node.values.items())
+
+        count = values["sum_count"]
+        lost = visits * self.virtual_loss
+        for key in self.utility_estimates:
+            if values.get(key) is not None:
+                values[key] = (values[key] * count + loss * lost) / (count + lost)
+        values["sum_count"] = count + lost
+
+        return view
+
+    def _backpropagate(self, node: Node, count: int):
+        agent = self.agent
+        if self.n_threads == 1:
+            agent.backpropagate(node, count)
+            return
+
+        for n in ancestors(node):
+            with self.node_locks[hash(n) % NODE_LOCKS]:
+                if count > 1:
+                    # the update adds the last visit itself
+                    n.values["sum_count"] += count - 1
+                n.values = agent.update(n, children(n))
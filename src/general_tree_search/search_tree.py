@@ -1,4 +1,5 @@
 from collections import defaultdict
+from general_tree_search import counters
 from general_tree_search.games import GameState
 
 
@@ -8,35 +9,114 @@ class Node[T]:
 
     For clarity, the state, action, and value functions (s(n), a(n, m), and v(n))
     are implemented as simple instance variables, not separate getter functions.
+
+    If `keys` is given, the values are stored in a plain dict with those keys set to
+    0.0, instead of a `defaultdict`, so reading any other key raises a KeyError.
+    Children inherit the keys of their parent.
+
+    With transpositions (see `components.expand.transposition_expand`) the search
+    tree becomes a DAG, and a node may have additional parents besides the one
+    it was created from.
+
+    The state of a node may be left out when it is created, in which case it is
+    computed from the parent state and the generating action on first access.
+    Instead of a copy of the applicable actions, nodes keep a cursor `n_expanded`
+    into the applicable actions of their state, which are expanded from the back.
+    An expand component may store its own order of the actions in `action_order`,
+    to be used at the same cursor (see `components.expand.get_ordered_expand`).
+    Likewise, a choose component may keep an ordering of the children in
+    `children_order`, which is cleared when the children are removed.
     """
 
     def __init__(
         self,
-        state: GameState[T],
+        state: GameState[T] | None,
         parent: "Node[T] | None",
         generating_action: T | None,
         depth: int = 0,
-        keys: list[str] | None = None,
+        keys: tuple[str, ...] | None = None,
     ):
         self._parent = parent
+        self._extra_parents: list[Node[T]] | None = None
         self._children: list[Node[T]] = []
         self.depth = depth
 
-        self.state = state
+        self._state = state
         self.generating_action = generating_action
-        self.unexpanded_actions = self.state.applicable_actions.copy()
+        self.n_expanded = 0
+        self.action_order: list[T] | None = None
+        self.children_order = None
 
-        self.values: dict[str] = defaultdict(float)
+        self.keys = keys
+        if keys is None:
+            self.values: dict[str] = defaultdict(float)
+        else:
+            self.values = dict.fromkeys(keys, 0.0)
 
     def __repr__(self):
         return f"Node[{self.values}]"
 
+    @property
+    def state(self) -> GameState[T]:
+        if self._state is None:
+            self._state = self._parent.state.result(self.generating_action)
+            counters.current().result_calls += 1
+        return self._state
+
+    @property
+    def unexpanded_actions(self) -> list[T]:
+        actions = self.state.applicable_actions
+        return actions[: len(actions) - self.n_expanded]
+
     def is_fully_expanded(self):
-        return not self.unexpanded_actions
+        return self.n_expanded >= len(self.state.applicable_actions)
+
+    def pop_action(self) -> T:
+        actions = self.state.applicable_actions
+        self.n_expanded += 1
+        return actions[len(actions) - self.n_expanded]
+
+    def add_child(self, state: GameState[T] | None, action: T) -> "Node[T]":
+        child = Node(
+            state=state,
+            parent=self,
+            generating_action=action,
+            depth=self.depth + 1,
+            keys=self.keys,
+        )
+        self._children.append(child)
+        counters.current().expansions += 1
+        return child
+
+    def add_transposition(self, node: "Node[T]"):
+        """
+        Links an existing node, whose state is also reached from this node, as a child.
+        """
+        self._children.append(node)
+        if node._extra_parents is None:
+            node._extra_parents = []
+        node._extra_parents.append(self)
+        counters.current().expansions += 1
 
     def is_max_node(self):
         return (self.state.moves % 2) == 0
 
+    def remove_children(self):
+        """
+        Removes all descendants, making this node an unexpanded leaf again.
+        """
+        self._children = []
+        self.n_expanded = 0
+        self.children_order = None
+
+    def detach(self) -> "Node[T]":
+        """
+        Makes this node the root of its own tree, so the rest of the tree can be
+        reclaimed once it is no longer referenced.
+        """
+        self._parent = None
+        return self
+
     def to_tree_string(self, indent=0, max_indent=None):
         if max_indent is not None and indent > max_indent:
             return ""
@@ -47,6 +127,10 @@ class Node[T]:
         return string
 
 
+def create_root[T](agent, state: GameState[T]) -> Node[T]:
+    return Node(state, parent=None, generating_action=None, keys=agent.value_keys)
+
+
 def parent[T](node: Node[T]) -> Node[T] | None:
     return node._parent
 
@@ -55,16 +139,86 @@ def children[T](node: Node[T]) -> list[Node[T]]:
     return node._children
 
 
+def parents[T](node: Node[T]) -> list[Node[T]]:
+    if node._parent is None:
+        return []
+    if node._extra_parents is None:
+        return [node._parent]
+    return [node._parent, *node._extra_parents]
+
+
+def ancestors[T](node: Node[T]) -> list[Node[T]]:
+    """
+    Returns `node` and all of its ancestors, each once, ordered such that every
+    node comes before its parents.
+    """
+    seen = {id(node): node}
+    stack = [node]
+    while stack:
+        for p in parents(stack.pop()):
+            if id(p) not in seen:
+                seen[id(p)] = p
+                stack.append(p)
+    # edges always go one level deeper, so sorting by depth is a topological order
+    return sorted(seen.values(), key=lambda n: -n.depth)
+
+
+def subtree_nodes[T](node: Node[T]) -> list[Node[T]]:
+    """
+    Returns all nodes reachable from `node`, each once.
+    """
+    seen = {id(node)}
+    nodes = [node]
+    for n in nodes:
+        for c in children(n):
+            if id(c) not in seen:
+                seen.add(id(c))
+                nodes.append(c)
+    return nodes
+
+
+def detached_copy[T](node: Node[T]) -> Node[T]:
+    """
+    Returns a parentless copy of `node` with a copy of its values, which can be
+    evaluated without other users of the tree seeing partial values.
+    """
+    copy = Node(node.state, None, node.generating_action, node.depth, node.keys)
+    copy.values = node.values.copy()
+    return copy
+
+
+def restrict_parents[T](nodes: list[Node[T]]):
+    """
+    Removes parents that are not in `nodes`, after the root of a DAG was detached.
+    """
+    ids = {id(n) for n in nodes}
+    for n in nodes:
+        if n._extra_parents is None:
+            continue
+        # the state can only be computed from the parent it was created from
+        n.state
+        kept = [p for p in parents(n) if id(p) in ids]
+        n._parent = kept[0] if kept else None
+        n._extra_parents = kept[1:] or None
+
+
+def find_descendant[T](node: Node[T], key, max_depth: int) -> Node[T] | None:
+    """
+    Breadth-first search for a node at most `max_depth` below `node`,
+    whose state has the given key.
+    """
+    frontier = [node]
+    for _ in range(max_depth + 1):
+        for n in frontier:
+            if n.state.key() == key:
+                return n
+        frontier = [c for n in frontier for c in children(n)]
+    return None
+
+
 def single_expand[T](node: Node[T]) -> Node[T]:
-    if node.state.is_terminal or not node.unexpanded_actions:
+    if node.state.is_terminal or node.is_fully_expanded():
+        counters.current().revisits += 1
         return node
-    action = node.unexpanded_actions.pop()
-    state = node.state.result(action)
-    child = Node(
-        state=state,
-        parent=node,
-        generating_action=action,
-        depth=node.depth + 1,
-    )
-    node._children.append(child)
-    return child
+    # the state of the child is computed when first needed
+    return node.add_child(None, node.pop_action())
@@ -0,0 +1,183 @@
+import json
+import numbers
+import struct
+import numpy as np
+
+from general_tree_search.search_tree import Node, children, parent, subtree_nodes
+
+
+MAGIC = b"GTSTREE1"
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _value(values, key: str) -> float:
+    value = values[key] if key in values else None
+    return np.nan if value is None else value
+
+
+def _edge_action(parent: Node, node: Node):
+    """
+    Returns the action leading from `parent` to `node`, if `node` was linked to
+    `parent` as a transposition, and created from another parent.
+    """
+    key = node.state.key()
+    for action in parent.state.applicable_actions:
+        if parent.state.result(action).key() == key:
+            return action
+    raise ValueError(f"{node} is not reachable from {parent}")
+
+
+def save_tree(root: Node, path: str):
+    """
+    Writes the tree below `root` to `path` in a compact binary format, which can be
+    opened with `load_tree`. Works for both `Node` and `ArrayNode` trees.
+
+    Nodes are numbered in breadth-first order, with `root` as 0. The file holds a
+    JSON header, followed by aligned arrays with the parent, depth and generating
+    action of each node, the children of each node in compressed sparse row form,
+    and a float64 column for each value key. Missing and `None` values are stored
+    as NaN. Actions are stored as int64 if they are all integers (-1 for none), and
+    as the bytes of their `str` otherwise.
+
+    Nodes shared in a DAG are stored once, with the parent they were created from,
+    so that `TreeSnapshot.path` replays to their state. If that parent is not part
+    of the saved tree, the parent they are first reached from is stored instead,
+    and the action from it is found by comparing state keys.
+    """
+    nodes = subtree_nodes(root)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+
+    child_lists = [children(node) for node in nodes]
+    child_offsets = np.zeros(n + 1, dtype=np.int64)
+    child_offsets[1:] = np.cumsum([len(c) for c in child_lists])
+    child_index = np.fromiter(
+        (index[c] for cs in child_lists for c in cs),
+        dtype=np.int32,
+        count=child_offsets[-1],
+    )
+
+    first_parent = np.full(n, -1, dtype=np.int32)
+    for i in range(n - 1, -1, -1):
+        # assigned in reverse, so the first parent in breadth-first order is kept
+        first_parent[child_index[child_offsets[i] : child_offsets[i + 1]]] = i
+
+    # each node is stored with the parent its generating action belongs to, so
+    # that paths replay to its state, also through nodes shared in a DAG
+    parent_index = np.full(n, -1, dtype=np.int32)
+    actions = [None] * n
+    for i in range(1, n):
+        node = nodes[i]
+        origin = index.get(parent(node))
+        if origin is not None:
+            parent_index[i] = origin
+            actions[i] = node.generating_action
+        else:
+            parent_index[i] = first_parent[i]
+            actions[i] = _edge_action(nodes[first_parent[i]], node)
+
+    depth = np.fromiter((node.depth for node in nodes), dtype=np.int32, count=n)
+
+    if all(a is None or isinstance(a, numbers.Integral) for a in actions):
+        action_type = "int"
+        action = np.array([-1 if a is None else a for a in actions], dtype=np.int64)
+    else:
+        action_type = "str"
+        action = np.array([b"" if a is None else str(a).encode() for a in actions])
+
+    keys = list(dict.fromkeys(key for node in nodes for key in node.values.keys()))
+
+    arrays = {
+        "parent": parent_index,
+        "depth": depth,
+        "action": action,
+        "child_offsets": child_offsets,
+        "child_index": child_index,
+    }
+    for key in keys:
+        arrays[f"values/{key}"] = np.fromiter(
+            (_value(node.values, key) for node in nodes), dtype=np.float64, count=n
+        )
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = (array.dtype.str, len(array), offset)
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps(
+        {"size": n, "keys": keys, "action_type": action_type, "arrays": layout}
+    ).encode()
+    start = _align(len(MAGIC) + 8 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name][2])
+            f.write(array.tobytes())
+
+
+class TreeSnapshot:
+    """
+    Read-only view of a tree written by `save_tree`. The arrays are memory-mapped
+    from the file, so opening a snapshot does not read or build the tree, and only
+    the pages touched by a query are loaded.
+
+    Nodes are referred to by their index, with the root at 0. `values` maps each
+    value key to its column.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a tree snapshot")
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        start = _align(len(MAGIC) + 8 + length)
+
+        arrays = {}
+        for name, (dtype, size, offset) in header["arrays"].items():
+            dtype = np.dtype(dtype)
+            begin = start + offset
+            arrays[name] = data[begin : begin + size * dtype.itemsize].view(dtype)
+
+        self.size: int = header["size"]
+        self.action_type: str = header["action_type"]
+        self.parent = arrays["parent"]
+        self.depth = arrays["depth"]
+        self.action = arrays["action"]
+        self.child_offsets = arrays["child_offsets"]
+        self.child_index = arrays["child_index"]
+        self.values = {key: arrays[f"values/{key}"] for key in header["keys"]}
+
+    def __len__(self):
+        return self.size
+
+    def children(self, index: int) -> np.ndarray:
+        offsets = self.child_offsets
+        return self.child_index[offsets[index] : offsets[index + 1]]
+
+    def path(self, index: int) -> list:
+        """Returns the actions leading from the root to the node at `index`."""
+        actions = []
+        while index > 0:
+            action = self.action[index]
+            if self.action_type == "int":
+                actions.append(int(action))
+            else:
+                actions.append(action.decode())
+            index = self.parent[index]
+        actions.reverse()
+        return actions
+
+
+def load_tree(path: str) -> TreeSnapshot:
+    return TreeSnapshot(path)
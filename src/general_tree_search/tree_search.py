@@ -1,13 +1,24 @@
 import time
+import asyncio
+import inspect
+import threading
 from abc import ABC, abstractmethod
 from typing import Callable, Any
 from collections import defaultdict
 from dataclasses import dataclass, asdict
+from general_tree_search import counters
 from general_tree_search.search_tree import (
     Node,
+    create_root,
+    find_descendant,
     parent,
+    parents,
     children,
+    ancestors,
+    subtree_nodes,
+    restrict_parents,
     single_expand,
+    detached_copy,
 )
 from general_tree_search.games import GameState
 
@@ -17,9 +28,11 @@ type Value = dict
 type ShouldTerminate = Callable[[TreeSearchAgent, Node], bool]
 type ShouldSelect = Callable[[TreeSearchAgent, Node], bool]
 type Choose = Callable[[TreeSearchAgent, list[Node]], Node]
+type Expand = Callable[[TreeSearchAgent, Node], list[Node]]
 type Evaluate = Callable[[TreeSearchAgent, GameState], Value]
 type Update = Callable[[TreeSearchAgent, Node, list[Node]], Value]
 type ExtractSolution = Callable[[TreeSearchAgent, Node], Any]
+type CreateRoot = Callable[[TreeSearchAgent, GameState], Node]
 
 
 @dataclass
@@ -29,6 +42,10 @@ class AgentDefinition:
     instead of the 5 from the article. This is because we include `get_solution`
     here, which is not part of the 5 component functions, and only used after
     the GTS algorithm has completed.
+
+    The remaining fields are optional, and select implementation details that are
+    not part of the article. When left as `None`, the defaults of `TreeSearchAgent`
+    are used.
     """
 
     should_terminate: ShouldTerminate
@@ -38,10 +55,18 @@ class AgentDefinition:
     update: Update
     get_solution: ExtractSolution
 
-    def to_agent_type(self, name: str):
+    create_root: CreateRoot | None = None
+    expand: Expand | None = None
+    value_keys: tuple[str, ...] | None = None
+
+    def to_agent_type(self, name: str, specialized: bool = False):
+        """
+        If `specialized` is set, the agent type runs its search iterations with the
+        components bound as local functions (see `specialized_iteration`).
+        """
         cls = type(name, (TreeSearchAgent,), {})
 
-        methods = asdict(self)
+        methods = {k: v for k, v in asdict(self).items() if v is not None}
 
         # attach methods as class methods
         for method_name, func in methods.items():
@@ -50,16 +75,74 @@ class AgentDefinition:
         # remove added methods from abstract method set
         cls.__abstractmethods__ = cls.__abstractmethods__.difference(methods.keys())
 
+        if specialized:
+            cls.make_iteration = specialized_iteration
+
         return cls
 
 
 class TreeSearchAgent(ABC):
     """
     Game playing agent implementing the General Tree Search (GTS) algorithm.
+
+    If `value_keys` is set, nodes start out with these keys in their values, which
+    the components update in place, instead of adding them on first use.
+
+    If `reuse_tree` is set, the search tree is kept between calls to `search`. The
+    next search continues from the node whose state matches the given state, if it
+    is found at most `reuse_depth` below the previous root, e.g. after the agent's
+    own move and the opponent's reply.
+
+    If `max_nodes` is set, the size of the search tree is bounded. When it grows
+    beyond `max_nodes`, the least visited subtrees are collapsed (see `evict`)
+    and the search continues.
+
+    If `batch_size` is greater than 1, each round of the search selects that many
+    leaves before evaluating them together (see `batch_iteration`).
+
+    After moving, the agent can keep searching in the background while the opponent
+    thinks (see `start_pondering`).
+
+    The work done by the agent's searches is counted in `counts` (see
+    `general_tree_search.counters`), and the counts of each search are recorded in
+    `search_stats`. If `instrument` is set, the time spent in each phase of the
+    search and the counts per phase are recorded as well (see
+    `instrumented_iteration`).
+
+    The start and end times of a search are read from `clock`, in nanoseconds, which
+    is also used by the timed termination components. It measures the CPU time of
+    the process.
     """
 
-    def __init__(self):
+    value_keys: tuple[str, ...] | None = None
+    clock = staticmethod(time.process_time_ns)
+
+    def __init__(
+        self,
+        reuse_tree: bool = False,
+        reuse_depth: int = 2,
+        max_nodes: int | None = None,
+        batch_size: int = 1,
+        instrument: bool = False,
+    ):
         self.search_stats = defaultdict(float)
+        self.counts = counters.Counters()
+        self.batch_size = batch_size
+        self.instrument = instrument
+
+        self.max_nodes = max_nodes
+        self.tree_size = 0
+
+        self.reuse_tree = reuse_tree
+        self.reuse_depth = reuse_depth
+        self.tree: Node | None = None
+
+        # state keys to nodes, filled by `components.expand.transposition_expand`
+        self.transpositions: dict[Any, Node] = {}
+
+        self.pondering: threading.Thread | None = None
+        self.ponder_stop = threading.Event()
+        self.ponder_iterations = 0
 
     def search(self, state: GameState, delay=0.0, plot_settings=None):
         """
@@ -67,39 +150,306 @@ class TreeSearchAgent(ABC):
         """
         assert not state.is_terminal, "Cannot search terminal states!"
 
-        # initialize search tree
-        root = Node(state, parent=None, generating_action=None)
+        ponder_iterations = self.stop_pondering()
 
-        iterations = 0
-        self.search_stats.clear()
-        self.search_stats["start_time"] = time.process_time_ns()
+        with counters.counting(self.counts):
+            # initialize search tree
+            root = self.init_tree(state)
 
-        # iterate until termination condition is met
-        while not self.should_terminate(root):
-            iterations += 1
+            iterations = 0
+            self.search_stats.clear()
+            self.search_stats["start_time"] = self.clock()
+            self.search_stats["ponder_iterations"] = ponder_iterations
+            self.start_counts()
 
-            if delay:
-                start = time.process_time()
-                while time.process_time() - start < delay:
-                    pass
-                print(root.to_tree_string())
+            should_terminate = self.should_terminate
+            iteration = self.make_iteration()
 
-            # forward pass through the search tree (alg. 2)
-            node = self.select(root)
-            # expand leaf node
-            child = single_expand(node)
+            # iterate until termination condition is met
+            while not should_terminate(root):
+                if delay:
+                    start = time.process_time()
+                    while time.process_time() - start < delay:
+                        pass
+                    print(root.to_tree_string())
 
-            # evaluate leaf node
-            child.values = self.evaluate(child)
-            # backpropagate through search tree (alg. 3)
-            self.backpropagate(node)
+                iterations += iteration(root)
 
-        self.search_stats["end_time"] = time.process_time_ns()
+        self.search_stats["end_time"] = self.clock()
         self.search_stats["iterations"] = iterations
+        self.end_counts()
 
         # return search tree
         return root
 
+    def start_search(self, state: GameState) -> "SearchHandle":
+        """
+        Starts an anytime search of `state`, which is advanced in chunks by the
+        returned handle instead of running until `should_terminate`.
+        """
+        assert not state.is_terminal, "Cannot search terminal states!"
+
+        ponder_iterations = self.stop_pondering()
+
+        with counters.counting(self.counts):
+            root = self.init_tree(state)
+
+        self.search_stats.clear()
+        self.search_stats["start_time"] = self.clock()
+        self.search_stats["ponder_iterations"] = ponder_iterations
+        self.start_counts()
+
+        return SearchHandle(self, root)
+
+    def start_counts(self):
+        """Records the counts of the agent at the start of a search."""
+        for name in counters.NAMES:
+            self.search_stats[f"{name}_start"] = getattr(self.counts, name)
+
+    def end_counts(self):
+        """Records the counts of the search since `start_counts` in `search_stats`."""
+        for name in counters.NAMES:
+            start = self.search_stats[f"{name}_start"]
+            self.search_stats[name] = getattr(self.counts, name) - start
+
+    def make_iteration(self) -> Callable[[Node], int]:
+        """
+        Returns the function used by the search loops to run an iteration, which is
+        `iteration` unless the agent is instrumented or its type is specialized.
+        """
+        if self.instrument:
+            return instrumented_iteration(self)
+        return self.iteration
+
+    def iteration(self, root: Node) -> int:
+        """
+        Runs one iteration of the search on the tree below `root`, or one round of
+        `batch_iteration`. Returns the number of iterations done.
+        """
+        if self.batch_size > 1:
+            return self.batch_iteration(root)
+
+        # forward pass through the search tree (alg. 2)
+        node = self.select(root)
+        # expand leaf node
+        leaves = self.expand(node)
+        # evaluate leaf nodes
+        self.evaluate_leaves(leaves)
+        # backpropagate through search tree (alg. 3)
+        self.backpropagate(node, max(len(leaves), 1))
+
+        if self.max_nodes is not None:
+            self.track_tree_size(root, node, leaves)
+
+        return 1
+
+    def evaluate_leaves(self, leaves: list[Node]):
+        """
+        Evaluates the leaves expanded in an iteration. Several leaves, e.g. from
+        `components.expand.full_expand`, are evaluated with a single call if the
+        evaluate component has a `batch` attribute.
+        """
+        evaluate_batch = getattr(self.evaluate, "batch", None)
+        if len(leaves) > 1 and evaluate_batch is not None:
+            evaluate_batch(self, leaves)
+        else:
+            for child in leaves:
+                child.values = self.evaluate(child)
+        self.counts.evaluations += len(leaves)
+
+    def track_tree_size(self, root: Node, node: Node, leaves: list[Node]):
+        """
+        Counts the leaves expanded from `node`, evicting nodes if the tree has grown
+        beyond `max_nodes`.
+        """
+        if not (len(leaves) == 1 and leaves[0] is node):
+            self.tree_size += len(leaves)
+        if self.tree_size > self.max_nodes:
+            self.evict(root)
+
+    def start_pondering(self, state: GameState):
+        """
+        Keeps searching from `state`, typically the state after the agent's own move,
+        in a background thread until the next call to `search`. That search then
+        continues from the pondered tree if the given state is found in it, as with
+        `reuse_tree`. The number of iterations done while pondering is recorded in
+        the `ponder_iterations` search statistic.
+
+        The thread shares the process with the caller, so pondering only adds search
+        time when the opponent runs elsewhere, e.g. in another process or program.
+        """
+        self.stop_pondering()
+        if state.is_terminal:
+            return
+
+        with counters.counting(self.counts):
+            root = self.init_tree(state)
+        self.tree = root
+
+        self.ponder_stop.clear()
+        self.ponder_iterations = 0
+        self.pondering = threading.Thread(
+            target=self._ponder, args=(root,), daemon=True
+        )
+        self.pondering.start()
+
+    def stop_pondering(self) -> int:
+        """
+        Stops pondering, returning the number of iterations done while pondering.
+        """
+        if self.pondering is None:
+            return 0
+
+        self.ponder_stop.set()
+        self.pondering.join()
+        self.pondering = None
+        return self.ponder_iterations
+
+    def _ponder(self, root: Node):
+        iteration = self.make_iteration()
+        with counters.counting(self.counts):
+            while not self.ponder_stop.is_set():
+                self.ponder_iterations += iteration(root)
+
+    async def search_async(
+        self,
+        state: GameState,
+        concurrency: int = 8,
+        clock: Callable[[], int] = time.perf_counter_ns,
+    ) -> Node:
+        """
+        Asynchronous variant of `search`, for evaluate components that are coroutine
+        functions, e.g. waiting for a model server or an external engine. Up to
+        `concurrency` leaves are evaluated at once, and each is backpropagated as
+        soon as its evaluation completes. Regular evaluate components also work.
+
+        Leaves are kept distinct as in `batch_iteration`, and are evaluated on
+        detached copies (see `search_tree.detached_copy`), so the default `Node`
+        tree is required.
+
+        The agent's `clock` is replaced by `clock` during the search, wall-clock time
+        by default, as the process time used by timed budgets does not advance while
+        evaluations are awaited.
+        """
+        agent_clock = self.clock
+        self.clock = clock
+        try:
+            with counters.counting(self.counts):
+                return await self._search_async(state, concurrency)
+        finally:
+            self.clock = agent_clock
+
+    async def _search_async(self, state: GameState, concurrency: int) -> Node:
+        assert not state.is_terminal, "Cannot search terminal states!"
+
+        ponder_iterations = self.stop_pondering()
+
+        root = self.init_tree(state)
+
+        iterations = 0
+        self.search_stats.clear()
+        self.search_stats["start_time"] = self.clock()
+        self.search_stats["ponder_iterations"] = ponder_iterations
+        self.start_counts()
+
+        pending = set()
+        in_flight = set()
+        terminated = False
+        while in_flight or not terminated:
+            # nodes are only evicted when no evaluations are in flight
+            over_size = self.max_nodes is not None and self.tree_size > self.max_nodes
+            if over_size and not in_flight:
+                self.evict(root)
+                over_size = False
+
+            while len(in_flight) < concurrency and not over_size:
+                terminated = self.should_terminate(root)
+                if terminated:
+                    break
+                path = self.select_path(root, pending)
+                if path is None:
+                    break
+                leaves = self.expand(path[-1])
+                pending.update(leaves)
+                for node in path[1:]:
+                    node.values["sum_count"] += 1
+                in_flight.add(asyncio.create_task(self._evaluate_async(path, leaves)))
+
+            if not in_flight:
+                continue
+
+            done, in_flight = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                path, leaves, copies = task.result()
+                iterations += 1
+
+                for child, copy in zip(leaves, copies):
+                    for key, value in copy.values.items():
+                        child.values[key] = value
+                self.counts.evaluations += len(leaves)
+                pending.difference_update(leaves)
+                for node in path[1:]:
+                    node.values["sum_count"] -= 1
+
+                node = path[-1]
+                self.backpropagate(node, max(len(leaves), 1))
+
+                if self.max_nodes is not None:
+                    if not (len(leaves) == 1 and leaves[0] is node):
+                        self.tree_size += len(leaves)
+
+        self.search_stats["end_time"] = self.clock()
+        self.search_stats["iterations"] = iterations
+        self.end_counts()
+
+        return root
+
+    async def _evaluate_async(self, path: list[Node], leaves: list[Node]):
+        async def evaluate(node: Node):
+            values = self.evaluate(node)
+            if inspect.isawaitable(values):
+                values = await values
+            node.values = values
+
+        copies = [detached_copy(child) for child in leaves]
+        await asyncio.gather(*(evaluate(copy) for copy in copies))
+        return path, leaves, copies
+
+    def init_tree(self, state: GameState) -> Node:
+        """
+        Returns the root of the search tree for `state`, reusing the subtree of a
+        previous search if possible.
+        """
+        root = None
+        if self.tree is not None:
+            root = find_descendant(self.tree, state.key(), self.reuse_depth)
+
+        if root is None:
+            root = self.create_root(state)
+            self.transpositions = {}
+            self.tree_size = 1
+        else:
+            # drop the rest of the previous tree
+            root = root.detach()
+
+            if self.transpositions:
+                nodes = subtree_nodes(root)
+                restrict_parents(nodes)
+                ids = {id(n) for n in nodes}
+                self.transpositions = {
+                    k: n for k, n in self.transpositions.items() if id(n) in ids
+                }
+
+            if self.max_nodes is not None:
+                self.tree_size = len(subtree_nodes(root))
+
+        # a pondered tree is only kept for the next search
+        self.tree = root if self.reuse_tree else None
+
+        return root
+
     def select(self, node: Node) -> Node:
         """
         Algorithm 2: Selection step
@@ -109,14 +459,172 @@ class TreeSearchAgent(ABC):
 
         return node
 
-    def backpropagate(self, node: Node):
+    def select_path(self, root: Node, pending: set[Node]) -> list[Node] | None:
+        """
+        Selection step that skips the nodes in `pending`, e.g. leaves that are
+        still being evaluated. Returns the path from the root to the selected node,
+        or None if every candidate is pending.
+        """
+        node = root
+        path = [node]
+        while self.should_select(node) and not node.state.is_terminal:
+            candidates = [c for c in children(node) if c not in pending]
+            if not candidates:
+                return None
+            node = self.choose(node, candidates)
+            path.append(node)
+
+        if node in pending:
+            return None
+        return path
+
+    def batch_iteration(self, root: Node) -> int:
+        """
+        Selects and expands up to `batch_size` leaves, evaluates them together, and
+        then backpropagates them one by one. Returns the number of leaves selected.
+
+        Leaves are kept distinct by skipping pending leaves during selection, and
+        by adding a visit to the nodes on their paths until they are backpropagated.
+        If the evaluate component has a `batch` attribute, it is called once with
+        all of the leaves (see `components.evaluate.get_additive_eval`).
+        """
+        pending = set()
+        batch = []
+        while len(batch) < self.batch_size:
+            path = self.select_path(root, pending)
+            if path is None:
+                break
+            leaves = self.expand(path[-1])
+            pending.update(leaves)
+            for node in path[1:]:
+                node.values["sum_count"] += 1
+            batch.append((path, leaves))
+
+        evaluate_batch = getattr(self.evaluate, "batch", None)
+        if evaluate_batch is not None:
+            evaluate_batch(self, [leaf for _, leaves in batch for leaf in leaves])
+        else:
+            for _, leaves in batch:
+                for child in leaves:
+                    child.values = self.evaluate(child)
+        self.counts.evaluations += sum(len(leaves) for _, leaves in batch)
+
+        for path, _ in batch:
+            for node in path[1:]:
+                node.values["sum_count"] -= 1
+        for path, leaves in batch:
+            self.backpropagate(path[-1], max(len(leaves), 1))
+
+        if self.max_nodes is not None:
+            for path, leaves in batch:
+                if not (len(leaves) == 1 and leaves[0] is path[-1]):
+                    self.tree_size += len(leaves)
+            if self.tree_size > self.max_nodes:
+                self.evict(root)
+
+        return len(batch)
+
+    def backpropagate(self, node: Node, count: int = 1):
         """
         Algorithm 3: Backpropagation step
+
+        `count` is the number of leaves evaluated in this iteration. The visit
+        counts of the updated nodes are increased by `count` instead of 1.
+
+        If the tree contains transpositions, every ancestor is updated once, after
+        all of its children on the way up.
+
+        If the update component has an `incremental` attribute, only the selected
+        node and its parent are updated in full, and the change in the parent's
+        values is passed up to the remaining ancestors. This lets them be updated
+        without scanning all of their children (see `components.update`), with
+        the same values up to floating point rounding.
         """
+        if count > 1:
+            # the update adds the last visit itself
+            if self.transpositions:
+                for n in ancestors(node):
+                    n.values["sum_count"] += count - 1
+            else:
+                n = node
+                while n is not None:
+                    n.values["sum_count"] += count - 1
+                    n = parent(n)
+
+        if self.transpositions:
+            for node in ancestors(node):
+                node.values = self.update(node, children(node))
+            return
+
+        incremental = getattr(self.update, "incremental", None)
+        if incremental is not None:
+            # the evaluation may have changed the values of the selected node
+            # in place, so the change is measured at its parent
+            node.values = self.update(node, children(node))
+            node = parent(node)
+            delta = None
+            while node is not None:
+                delta = incremental(self, node, delta)
+                node = parent(node)
+            return
+
         while node is not None:
             node.values = self.update(node, children(node))
             node = parent(node)
 
+    def evict(self, root: Node):
+        """
+        Collapses the least visited subtrees into their top node, until the tree
+        holds at most 3/4 of `max_nodes` nodes. The collapsed nodes keep their
+        values and become unexpanded leaves, which may be expanded again later.
+
+        If the update component has a `collapse` attribute, it is called on each
+        collapsed node first, to fold the statistics of the removed children into
+        the node's own values.
+        """
+        collapse = getattr(self.update, "collapse", None)
+        target = self.max_nodes * 3 // 4
+
+        candidates = sorted(
+            (n for n in subtree_nodes(root)[1:] if children(n)),
+            key=lambda n: n.values["sum_count"],
+        )
+        removed = set()
+        for node in candidates:
+            if self.tree_size <= target:
+                break
+            if node in removed:
+                continue
+
+            below = subtree_nodes(node)[1:]
+            if self.transpositions:
+                # shared nodes can only be removed with all of their parents
+                inside = {node, *below}
+                if any(p not in inside for n in below for p in parents(n)):
+                    continue
+
+            if collapse is not None:
+                collapse(self, node)
+            node.remove_children()
+
+            removed.update(below)
+            self.tree_size -= len(below)
+            self.search_stats["evicted_nodes"] += len(below)
+
+        if self.transpositions:
+            self.transpositions = {
+                k: n for k, n in self.transpositions.items() if n not in removed
+            }
+
+    def expand(self, node: Node) -> list[Node]:
+        """
+        Expands the selected node, returning the nodes to evaluate.
+        """
+        return [single_expand(node)]
+
+    def create_root(self, state: GameState) -> Node:
+        return create_root(self, state)
+
     @abstractmethod
     def should_terminate(self):
         pass
@@ -140,3 +648,183 @@ class TreeSearchAgent(ABC):
     @abstractmethod
     def get_solution(self):
         pass
+
+
+class SearchHandle:
+    """
+    Handle to an anytime search, see `TreeSearchAgent.start_search`.
+
+    The search is advanced with `run`, and the current solution can be queried with
+    `solution` between calls. Handles of different agents can be advanced in turn
+    to interleave many searches in one process, but an agent runs one search at a
+    time.
+    """
+
+    def __init__(self, agent: TreeSearchAgent, root: Node):
+        self.agent = agent
+        self.root = root
+        self.iterations = 0
+        self.stopped = False
+        self.iteration = agent.make_iteration()
+
+    def run(self, iterations: int, deadline: float | None = None) -> int:
+        """
+        Runs up to `iterations` iterations, and returns the number done. Runs fewer
+        if `time.perf_counter()` passes `deadline`, the agent's `should_terminate`
+        holds, or the search is stopped.
+        """
+        agent = self.agent
+        done = 0
+        with counters.counting(agent.counts):
+            while done < iterations and not self.stopped:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if agent.should_terminate(self.root):
+                    self.stop()
+                    break
+                done += self.iteration(self.root)
+
+        self.iterations += done
+        agent.search_stats["iterations"] = self.iterations
+        return done
+
+    def solution(self):
+        """Returns the current solution of the search, e.g. the best move."""
+        return self.agent.get_solution(self.root)
+
+    def stop(self):
+        if not self.stopped:
+            self.stopped = True
+            self.agent.search_stats["end_time"] = self.agent.clock()
+            self.agent.end_counts()
+
+
+def specialized_iteration(agent: TreeSearchAgent) -> Callable[[Node], int]:
+    """
+    Returns a version of `agent.iteration` with the components of the agent bound
+    as local functions, and the tree traversal inlined, giving the same results
+    with less overhead per iteration. The components are bound when the function
+    is made, once per search.
+
+    Batched searches use `batch_iteration`, and iterations that evaluate several
+    leaves or run on a tree with transpositions use `backpropagate`.
+    """
+    if agent.instrument:
+        return instrumented_iteration(agent)
+    if agent.batch_size > 1:
+        return agent.batch_iteration
+
+    should_select = agent.should_select
+    choose = agent.choose
+    expand = agent.expand
+    evaluate = agent.evaluate
+    evaluate_batch = getattr(evaluate, "batch", None)
+    update = agent.update
+    incremental = getattr(update, "incremental", None)
+    backpropagate = agent.backpropagate
+    max_nodes = agent.max_nodes
+    counts = agent.counts
+
+    def iteration(root: Node) -> int:
+        node = root
+        while should_select(node) and not node.state.is_terminal:
+            node = choose(node, node._children)
+
+        leaves = expand(node)
+        if len(leaves) > 1 and evaluate_batch is not None:
+            evaluate_batch(agent, leaves)
+        else:
+            for child in leaves:
+                child.values = evaluate(child)
+        counts.evaluations += len(leaves)
+
+        if len(leaves) > 1 or agent.transpositions:
+            backpropagate(node, max(len(leaves), 1))
+        elif incremental is not None:
+            node.values = update(node, node._children)
+            n = node._parent
+            delta = None
+            while n is not None:
+                delta = incremental(agent, n, delta)
+                n = n._parent
+        else:
+            n = node
+            while n is not None:
+                n.values = update(n, n._children)
+                n = n._parent
+
+        if max_nodes is not None:
+            agent.track_tree_size(root, node, leaves)
+
+        return 1
+
+    return iteration
+
+
+def instrumented_iteration(agent: TreeSearchAgent) -> Callable[[Node], int]:
+    """
+    Returns a version of `agent.iteration` that records the following statistics in
+    `agent.search_stats`:
+
+    - `select_time`, `expand_time`, `evaluate_time` and `backpropagate_time`, in
+      nanoseconds.
+    - `select_result_calls`, `expand_result_calls`, `evaluate_result_calls` and
+      `backpropagate_result_calls`, the calls to `GameState.result` made in each
+      phase, including the moves of rollouts. States are computed when first
+      accessed, so the states of new nodes are mostly computed while evaluating
+      them, and their cost is part of `evaluate_time` rather than `expand_time`.
+    - `terminal_hits`, the number of iterations that selected a terminal node.
+    - `selection_depth_max` and `selection_depth_avg`, relative to the root.
+
+    Batched rounds are not instrumented.
+    """
+    if agent.batch_size > 1:
+        return agent.batch_iteration
+
+    stats = agent.search_stats
+    clock = time.perf_counter_ns
+    counts = agent.counts
+
+    def iteration(root: Node) -> int:
+        start_calls = counts.result_calls
+        start = clock()
+        node = agent.select(root)
+        selected = clock()
+        selected_calls = counts.result_calls
+        leaves = agent.expand(node)
+        expanded = clock()
+        expanded_calls = counts.result_calls
+        agent.evaluate_leaves(leaves)
+        evaluated = clock()
+        evaluated_calls = counts.result_calls
+        agent.backpropagate(node, max(len(leaves), 1))
+        end = clock()
+        end_calls = counts.result_calls
+
+        stats["select_time"] += selected - start
+        stats["expand_time"] += expanded - selected
+        stats["evaluate_time"] += evaluated - expanded
+        stats["backpropagate_time"] += end - evaluated
+
+        stats["select_result_calls"] += selected_calls - start_calls
+        stats["expand_result_calls"] += expanded_calls - selected_calls
+        stats["evaluate_result_calls"] += evaluated_calls - expanded_calls
+        stats["backpropagate_result_calls"] += end_calls - evaluated_calls
+
+        if len(leaves) == 1 and leaves[0] is node:
+            stats["terminal_hits"] += node.state.is_terminal
+
+        depth = node.depth - root.depth
+        stats["selections"] += 1
+        stats["selection_depth_total"] += depth
+        stats["selection_depth_max"] = max(stats["selection_depth_max"], depth)
+        stats["selection_depth_avg"] = (
+            stats["selection_depth_total"] / stats["selections"]
+        )
+
+        if agent.max_nodes is not None:
+            agent.track_tree_size(root, node, leaves)
+
+        return 1
+
+    return iteration